@@ -1,28 +1,144 @@
 import datetime
+from collections.abc import MutableMapping
+import weakref
 import numpy as np
 import pandas as pd
 
 
-from typing import Dict, List, Tuple, Union, Literal
+from typing import Dict, List, Tuple, Union, Literal, Callable, Iterator
 
 from CaptureDataParser.HeaderData import SignalHeaderHF, SignalHeaderLF, TimeInfo
-from CaptureDataParser.parse_payload import construct_time
-from CaptureDataParser.utils import get_signal_name_head, hash_list, check_key_pattern
+from CaptureDataParser.parse_payload import construct_time, time_mapping, is_long_format, pivot_lfdata
+from CaptureDataParser.ClockModel import ClockModel
+from CaptureDataParser.SignalCatalog import SignalCatalog
+from CaptureDataParser.utils import get_signal_name_head, hash_list, to_unix_times, asof_index, reduce_ranges
 
 # workaround to construct the type
 dict_keys = type({}.keys())
 
 
+class LazyGroups(MutableMapping):
+    """
+    Dictionary of the groups of a recording that builds the DataFrame of a group only when it is accessed for the first
+    time. The groups are given as functions that return the DataFrame (e.g. from the decoded buffers or from a cache
+    entry on disk); the function is released once the DataFrame is built.
+    """
+    def __init__(
+            self,
+            loaders: Dict[str, Union[pd.DataFrame, Callable[[], pd.DataFrame]]],
+            transform: Callable[[str, pd.DataFrame], pd.DataFrame] = None
+    ) -> None:
+        """
+        :param loaders: group and function that returns its DataFrame (or the DataFrame itself)
+        :param transform: function that is applied to a group after loading it, e.g. to construct the time
+        """
+        self._loaders = dict(loaders)
+        self._frames: Dict[str, pd.DataFrame] = dict()
+        self.transform = transform
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        if key not in self._frames:
+            if key not in self._loaders:
+                raise KeyError(key)
+            loader = self._loaders[key]
+            df = loader() if callable(loader) else loader
+            if self.transform is not None:
+                df = self.transform(key, df)
+            self._frames[key] = df
+            self._loaders[key] = None
+        return self._frames[key]
+
+    def __setitem__(self, key: str, value: pd.DataFrame) -> None:
+        self._frames[key] = value
+        self._loaders[key] = None
+
+    def __delitem__(self, key: str) -> None:
+        del self._loaders[key]
+        self._frames.pop(key, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._loaders)
+
+    def __len__(self) -> int:
+        return len(self._loaders)
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._frames
+
+
 class CapturePayload:
-    def __init__(self, data, timeinfo: TimeInfo = None) -> None:
-        self.data = construct_time(data, timeinfo) if timeinfo else data
-        # organize signal names into groups
-        self._grouped_signals = self._group_signals(self.data)
+    def __init__(
+            self,
+            data,
+            timeinfo: TimeInfo = None,
+            shapes: Dict[str, Tuple[int, int]] = None,
+            clock: ClockModel = None,
+            fingerprints: Dict[str, Union[str, Dict[str, str], None]] = None
+    ) -> None:
+        """
+        :param data: DataFrames of the groups. A group may also be given as a function that returns its DataFrame;
+        then all groups are built (and their time is constructed) only when they are accessed for the first time.
+        :param timeinfo: initial time of the recording (the time is constructed if given)
+        :param shapes: shapes of the groups in the recording (including groups and signals that were not decoded)
+        :param clock: clock model of the recording (fitted from HFTimestamp if None)
+        :param fingerprints: G-code hashes computed while decoding (see parse())
+        """
+        self.timeinfo = timeinfo
+        self._clock = clock
+        # "g_code": hash of the G-code (cached by hash_g_code()), "tool" / "path": hashes per tool / call-stack path
+        self.fingerprints = dict(fingerprints) if fingerprints is not None else dict()
+        construct = bool(timeinfo) and ("HFTimestamp" in data)
+
+        if any(callable(vl) for vl in data.values()):
+            self.data = LazyGroups(data, transform=self._construct_time if construct else None)
+            if shapes is None:
+                shapes = {ky: self.data[ky].shape for ky in self.data}
+            else:
+                # add the column of the constructed time
+                shapes = {
+                    ky: (n_rows, n_cols + int(construct and (ky in data) and (ky in time_mapping)))
+                    for ky, (n_rows, n_cols) in shapes.items()
+                }
+        else:
+            shapes = shapes if shapes is not None else {ky: vl.shape for ky, vl in data.items()}
+            n_columns = {ky: vl.shape[1] for ky, vl in data.items()}
+
+            self.data = data
+            if construct:
+                self.data = construct_time(data, timeinfo, clock=self.clock)
+            # add columns of the constructed time
+            shapes = {
+                ky: (n_rows, n_cols + (self.data[ky].shape[1] - n_columns[ky] if ky in self.data else 0))
+                for ky, (n_rows, n_cols) in shapes.items()
+            }
+        self.shapes = shapes
+        # index of the signal names of each group (built on first use)
+        self._catalogs: Dict[str, SignalCatalog] = dict()
+        # sorted indexes of the counter / time columns (built on first use)
+        self._sorted_index: Dict[Tuple[str, str], Tuple[np.ndarray, Union[np.ndarray, None], int]] = dict()
+        # aligned tables per signal set
+        self._aligned: Dict[tuple, pd.DataFrame] = dict()
+        # row ranges of the events in the base group
+        self._segments: Dict[tuple, pd.DataFrame] = dict()
+        # DataFrame of each group that the cached entries were built from
+        self._cached_frames: Dict[str, weakref.ref] = dict()
+        # peak memory per parse stage (see parse(trace_memory=True))
+        self.memory_stages: Union[pd.DataFrame, None] = None
 
     def __repr__(self) -> str:
-        repr_data = {ky: vl.shape for ky, vl in self.data.items()}
+        repr_data = {
+            ky: self.data[ky].shape if not isinstance(self.data, LazyGroups) or self.data.is_loaded(ky) else "lazy"
+            for ky in self.data
+        }
         return f"CapturePayload(data={repr_data})"
 
+    def _construct_time(self, group: str, df: pd.DataFrame) -> pd.DataFrame:
+        """constructs the time of a single group (lazy mode)"""
+        if group in time_mapping:
+            # every group starts with the recording
+            df["Time"] = self.clock.to_datetime(df[time_mapping[group]], method="interpolate", epoch=0)
+        return df
+
     def __getitem__(
             self,
             item: Union[str, Tuple[str, Union[str, int]]]
@@ -40,15 +156,31 @@ class CapturePayload:
             index_as=index_as
         )
 
+    def catalog(self, group: str) -> SignalCatalog:
+        """index of the signal names of a group"""
+        self._validate_cache(group)
+        if group not in self._catalogs:
+            self._catalogs[group] = SignalCatalog(get_columns(self.data[group]))
+        return self._catalogs[group]
+
+    def _columns(self, group: str) -> List[str]:
+        return self.catalog(group).columns
+
     def _check_key(self, group, key):
-        if key not in self.data[group]:
-            # assume regex pattern
-            new_ky = check_key_pattern(self.data[group].columns, key)
-            if new_ky:
-                key = new_ky
-            else:
-                raise KeyError(f"Key {key} not in self.data[{group}].")
-        return key
+        # exact name or first match of a regex pattern
+        new_ky = self.catalog(group).first(key)
+        if new_ky is None:
+            raise KeyError(f"Key {key} not in self.data[{group}].")
+        return new_ky
+
+    def find_signals(self, group: str, pattern: str) -> List[str]:
+        """
+        all signals of a group that match a name or regex pattern
+        :param group: data group
+        :param pattern: name or regex pattern (re.match)
+        :return: signal names in the order of the columns
+        """
+        return self.catalog(group).resolve(pattern)
 
     def get_item(
             self,
@@ -57,7 +189,22 @@ class CapturePayload:
             index_as: Literal["timeseries", "HFProbeCounter", "counter", None] = None,
             not_na: bool = False,
             limit_to: Literal["hfdata"] | int | datetime.datetime = None,
+            ffill: bool = False,
+            copy: bool = False
     ) -> pd.DataFrame | pd.Series:
+        """
+        queries the data of a group. The result shares the memory of the data wherever possible (selected columns,
+        contiguous rows and the new index are not copied); pandas' copy-on-write (pandas >= 3.0) protects the data from
+        modifications of the result.
+        :param group: data group
+        :param key: signal name(s) or regex pattern(s) (all signals if None)
+        :param index_as: use the time ("timeseries") or the HFProbeCounter as index
+        :param not_na: drop rows where all values are NaN
+        :param limit_to: "hfdata" (HFProbeCounter of the last HFTimestamp), a counter value or a time (exclusive)
+        :param ffill: forward fill the values
+        :param copy: return a deep copy that does not share memory with the data
+        :return: DataFrame or Series if a single key is given
+        """
         # query data
         if key:
             if isinstance(key, (list, tuple)):
@@ -68,40 +215,370 @@ class CapturePayload:
             else:
                 keys = self._check_key(group, key)
 
-            df = self.data[group][keys]
+        if is_long_format(self.data[group]):
+            # LFData: build the wide view only for the requested addresses
+            addresses = None if not key else (keys if isinstance(keys, list) else [keys])
+            df = pivot_lfdata(self.data[group], addresses, ffill=ffill)
+            if key:
+                df = df[keys]
         else:
-            df = self.data[group]
+            df = self.data[group][keys] if key else self.data[group]
+            if ffill:
+                df = df.ffill()
 
-        # limit rows
+        # limit rows (positions of the rows in the group)
+        rows = None
         if (
                 isinstance(limit_to, str) and
                 (limit_to.lower() == "hfdata") and
                 ("HFTimestamp" in self.data) and ("HFProbeCounter" in self.data[group])
         ):
-            # get last / maximum probe counter
+            # get last / maximum probe counter (the counter is an integer)
             hfprobe_counter_max = self.data["HFTimestamp"]["HFProbeCounter"].iloc[-1]
-            # crop data
-            lg = self.data[group]["HFProbeCounter"] <= hfprobe_counter_max
-            df = df[lg]
+            rows = self._select_rows(group, "HFProbeCounter", None, hfprobe_counter_max + 1)
         elif (
                 isinstance(limit_to, (int, np.int32, np.int64)) and
                 (("CYCLE" in self.data[group]) or ("HFProbeCounter" in self.data[group]))
         ):
-            ky = "CYCLE" if "CYCLE" in self.data[group] else "HFProbeCounter"
-            lg = self.data[group][ky] < limit_to
-            df = df[lg[df.index]]
+            rows = self._select_rows(group, self._counter_column(group), None, limit_to)
         elif isinstance(limit_to, datetime.datetime) and ("Time" in self.data[group]):
-            lg = self.data[group]["Time"] < limit_to
-            df = df[lg[df.index]]
+            rows = self._select_rows(group, "Time", None, limit_to)
+        if rows is not None:
+            df = df.iloc[rows]
 
-        # set different index
+        # set different index (a new object, the index of the data is not modified)
+        index = None
         if isinstance(index_as, str):
             if (index_as.lower() == "timeseries") and ("Time" in self.data[group]):
-                df.set_index(self.data[group]["Time"][df.index], inplace=True)
+                index = self.data[group]["Time"]
             elif (index_as.lower() in ("hfprobecounter", "counter")) and ("HFProbeCounter" in self.data[group]):
-                df.set_index(self.data[group]["HFProbeCounter"][df.index], inplace=True)
+                index = self.data[group]["HFProbeCounter"]
+        if index is not None:
+            index = index.iloc[rows] if rows is not None else index
+            df = df.set_axis(pd.Index(index))
 
-        return df.dropna(axis="index", how="all") if not_na else df
+        if not_na:
+            lg = df.notna().to_numpy()
+            if lg.ndim > 1:
+                lg = lg.any(axis=1)
+            # avoid a copy if no row is dropped
+            if not lg.all():
+                df = df[lg]
+        return df.copy(deep=True) if copy else df
+
+    def get_range(
+            self,
+            group: str,
+            start: int | datetime.datetime = None,
+            stop: int | datetime.datetime = None,
+            by: Literal["counter", "time"] = "counter"
+    ) -> pd.DataFrame:
+        """
+        rows of a group whose counter (CYCLE for HFData, HFProbeCounter otherwise) or time lies in [start, stop). The
+        rows are found by a binary search on a sorted index; a view of the data is returned if the column is sorted.
+        :param group: data group
+        :param start: first counter value / time (inclusive, no lower bound if None)
+        :param stop: last counter value / time (exclusive, no upper bound if None)
+        :param by: "counter" or "time"
+        :return: rows of the group in their original order
+        """
+        if by == "counter":
+            column = self._counter_column(group)
+        elif by == "time":
+            column = "Time"
+        else:
+            raise Exception(f"Unknown value by={by}. Use 'counter' or 'time'.")
+        if column not in self.data[group]:
+            raise KeyError(f"Key {column} not in self.data[{group}].")
+        return self.data[group].iloc[self._select_rows(group, column, start, stop)]
+
+    def align(
+            self,
+            groups: Union[str, List[str]],
+            signals: Dict[str, List[str]] = None,
+            on: Literal["counter", "time"] = "counter",
+            how: Literal["backward", "forward", "nearest"] = "backward",
+            tolerance: Union[int, datetime.timedelta, str] = None,
+            base: str = "HFData"
+    ) -> pd.DataFrame:
+        """
+        aligns the signals of other groups (e.g. LFData, HFBlockEvent, HFCallEvent) to the rows of a base group (e.g.
+        HFData) by an as-of join on the counter or the time: every row of the base group gets the last value of a
+        signal at or before its counter ("backward"), the next value ("forward") or the closest value ("nearest").
+        LFData is aligned per address. The result is cached per signal set.
+        :param groups: groups to align to the base group
+        :param signals: names or regex patterns of the signals per group (all signals of a group if not listed). The
+        signals of the base group are only included if listed.
+        :param on: "counter" (CYCLE / HFProbeCounter) or "time". Use "time" for recordings with counter resets.
+        :param how: "backward", "forward" or "nearest"
+        :param tolerance: maximum distance of the matched values in counts or as time span (e.g. "10ms")
+        :param base: group whose rows define the result
+        :return: DataFrame with the rows of the base group (its counter, time and the aligned signals as columns)
+        """
+        groups = [groups] if isinstance(groups, str) else list(groups)
+        signals = signals if signals is not None else dict()
+        ky = (
+            tuple(groups),
+            tuple((g, tuple(signals[g])) for g in sorted(signals) if (g == base) or (g in groups)),
+            on, how, str(tolerance), base
+        )
+        self._validate_cache(base, *groups)
+        if ky in self._aligned:
+            return self._aligned[ky].copy(deep=False)
+
+        if on == "counter":
+            column = self._counter_column(base)
+            if tolerance is not None:
+                tolerance = int(tolerance)
+        elif on == "time":
+            column = "Time"
+            if tolerance is not None:
+                tolerance = pd.Timedelta(tolerance).value
+        else:
+            raise Exception(f"Unknown value on={on}. Use 'counter' or 'time'.")
+        if column not in self.data[base]:
+            raise KeyError(f"Key {column} not in self.data[{base}].")
+
+        # rows of the base group
+        columns = [column] + (["Time"] if (column != "Time") and ("Time" in self.data[base]) else [])
+        if base in signals:
+            columns += [el for el in self._resolve(base, signals[base]) if el not in columns]
+        df = self.data[base][columns]
+        x = self._key_values(base, column)
+        # rows of the base group without a key do not match
+        lg_na = self.data[base][column].isna().to_numpy()
+
+        aligned = dict()
+        for group in groups:
+            key_column = "Time" if on == "time" else self._counter_column(group)
+            if key_column not in self.data[group]:
+                raise KeyError(f"Key {key_column} not in self.data[{group}].")
+            names = self._resolve(group, signals[group]) if group in signals else None
+
+            if is_long_format(self.data[group]):
+                # one column per address from the datapoints of this address
+                lf = self.data[group]
+                codes, uniques = pd.factorize(lf["Address"])
+                uniques = list(uniques)
+                xp_all = self._key_values(group, key_column)
+                lg_valid = lf[key_column].notna().to_numpy()
+                values = lf["Value"].to_numpy()
+                for name in (names if names is not None else uniques):
+                    if name not in uniques:
+                        continue
+                    rows = np.flatnonzero((codes == uniques.index(name)) & lg_valid)
+                    order = np.argsort(xp_all[rows], kind="stable")
+                    idx = asof_index(x, xp_all[rows][order], how, tolerance)
+                    idx[lg_na] = -1
+                    # restore data type of this address
+                    val = pd.Series(values[rows[order]], dtype=values.dtype).infer_objects().to_numpy()
+                    aligned[self._aligned_name(name, group, columns, aligned)] = pd.api.extensions.take(
+                        val, idx, allow_fill=True
+                    )
+            else:
+                names = names if names is not None else [
+                    el for el in self._columns(group) if el not in ("HFProbeCounter", "CYCLE", "Time")
+                ]
+                values, order, n_valid = self._get_sorted_index(group, key_column)
+                idx = asof_index(x, values[:n_valid], how, tolerance)
+                idx[lg_na] = -1
+                if order is not None:
+                    idx = np.where(idx >= 0, order[np.maximum(idx, 0)], -1)
+                for name in names:
+                    aligned[self._aligned_name(name, group, columns, aligned)] = pd.api.extensions.take(
+                        self.data[group][name].to_numpy(), idx, allow_fill=True
+                    )
+
+        df = pd.concat([df, pd.DataFrame(aligned, index=df.index, copy=False)], axis=1)
+        self._aligned[ky] = df
+        return df.copy(deep=False)
+
+    def segments(
+            self,
+            group: str = "HFBlockEvent",
+            base: str = "HFData",
+            on: Literal["counter", "time"] = "counter"
+    ) -> pd.DataFrame:
+        """
+        row ranges [start, stop) of the base group during which an event (e.g. an NC block of HFBlockEvent or a call of
+        HFCallEvent) is active, i.e. from its counter to the counter of the next event (or the end of the recording).
+        The ranges are computed once and cached.
+        :param group: group of the events
+        :param base: group whose rows are segmented (has to be sorted by the counter / time)
+        :param on: "counter" or "time". Use "time" for recordings with counter resets.
+        :return: events in the order of their counter with the additional columns start and stop (row positions)
+        """
+        ky = (group, base, on)
+        self._validate_cache(group, base)
+        if ky not in self._segments:
+            if on == "counter":
+                column, event_column = self._counter_column(base), self._counter_column(group)
+            elif on == "time":
+                column, event_column = "Time", "Time"
+            else:
+                raise Exception(f"Unknown value on={on}. Use 'counter' or 'time'.")
+
+            values, order, n_valid = self._get_sorted_index(base, column)
+            if order is not None:
+                raise Exception(
+                    f"self.data[{base}][{column}] is not sorted (counter resets?). Segment the recording by time."
+                )
+            keys, event_order, n_events = self._get_sorted_index(group, event_column)
+            starts = np.searchsorted(values, keys[:n_events], side="left")
+            stops = np.append(starts[1:], len(values))
+
+            events = self.data[group]
+            events = events.iloc[event_order[:n_events]] if event_order is not None else events.iloc[:n_events]
+            ranges = pd.DataFrame({"start": starts, "stop": stops}, index=events.index)
+            self._segments[ky] = pd.concat([ranges, events], axis=1)
+        return self._segments[ky].copy(deep=False)
+
+    def reduce_segments(
+            self,
+            signals: Union[str, List[str]] = None,
+            reductions: List[str] = ("mean", "rms", "min", "max"),
+            percentiles: List[float] = None,
+            group: str = "HFBlockEvent",
+            base: str = "HFData",
+            on: Literal["counter", "time"] = "counter"
+    ) -> pd.DataFrame:
+        """
+        reduces signals of the base group over the segments of an event group (e.g. the RMS current per NC block) for
+        all signals at once, see CapturePayload.segments()
+        :param signals: names or regex patterns of the signals (all numeric signals if None)
+        :param reductions: "mean", "rms", "min", "max", "sum", "count"
+        :param percentiles: percentiles in [0, 100], e.g. [50, 95] (columns "p50", "p95")
+        :param group: group of the events
+        :param base: group whose rows are reduced
+        :param on: "counter" or "time"
+        :return: DataFrame with the index of the segments and the columns (signal, reduction)
+        """
+        segments = self.segments(group, base, on)
+        if signals is None:
+            names = [
+                el for el in self._columns(base)
+                if (el not in ("CYCLE", "HFProbeCounter")) and pd.api.types.is_numeric_dtype(self.data[base][el])
+            ]
+        else:
+            names = self._resolve(base, [signals] if isinstance(signals, str) else signals)
+
+        values = np.column_stack([self.data[base][el].to_numpy(dtype=np.float64) for el in names]) \
+            if names else np.empty((len(self.data[base]), 0))
+        results = reduce_ranges(
+            values,
+            segments["start"].to_numpy(),
+            segments["stop"].to_numpy(),
+            reductions=reductions,
+            percentiles=percentiles
+        )
+        columns = pd.MultiIndex.from_tuples(
+            [(el, stat) for el in names for stat in results],
+            names=["signal", "reduction"]
+        )
+        table = np.stack([results[stat] for stat in results], axis=2).reshape(len(segments), -1)
+        return pd.DataFrame(table, index=segments.index, columns=columns)
+
+    def _resolve(self, group: str, patterns: List[str]) -> List[str]:
+        """all signals of a group that match a list of names or regex patterns (in the order of the columns)"""
+        selected = set(el for pattern in patterns for el in self.catalog(group).resolve(pattern))
+        return [el for el in self._columns(group) if el in selected]
+
+    def _key_values(self, group: str, column: str) -> np.ndarray:
+        """values of a counter or time column (time as nanoseconds since epoch) in the order of the rows"""
+        if column == "Time":
+            return to_unix_times(self.data[group][column])
+        return self.data[group][column].to_numpy()
+
+    @staticmethod
+    def _aligned_name(name: str, group: str, *existing) -> str:
+        """prefixes a column name by its group if the name exists already"""
+        return f"{group}.{name}" if any(name in el for el in existing) else name
+
+    def _validate_cache(self, *groups: str) -> None:
+        """
+        drops the cached catalogs, sorted indexes, aligned tables and segments of groups whose DataFrame was replaced
+        (e.g. by data[group] = df) since the entries were built
+        """
+        for group in groups:
+            df = self.data[group]
+            ref = self._cached_frames.get(group)
+            if (ref is not None) and (ref() is df):
+                continue
+            if ref is not None:
+                self._catalogs.pop(group, None)
+                # groups that an entry depends on: (group, column), (groups, signals, on, how, tolerance, base) and
+                # (group, base, on)
+                for cache, depends in (
+                        (self._sorted_index, lambda ky: ky[:1]),
+                        (self._aligned, lambda ky: ky[0] + ky[5:]),
+                        (self._segments, lambda ky: ky[:2])
+                ):
+                    for ky in [ky for ky in cache if group in depends(ky)]:
+                        del cache[ky]
+            self._cached_frames[group] = weakref.ref(df)
+
+    def _counter_column(self, group: str) -> str:
+        return "CYCLE" if "CYCLE" in self.data[group] else "HFProbeCounter"
+
+    def _get_sorted_index(self, group: str, column: str) -> Tuple[np.ndarray, Union[np.ndarray, None], int]:
+        """
+        sorted values of a column, the order of the rows (None if the column is sorted already) and the number of
+        values that are not missing (missing values are sorted to the end)
+        """
+        ky = (group, column)
+        self._validate_cache(group)
+        if ky not in self._sorted_index:
+            series = self.data[group][column]
+            if column == "Time":
+                values = to_unix_times(series).copy()
+                lg_na = series.isna().to_numpy()
+                values[lg_na] = np.iinfo(np.int64).max
+            else:
+                values = series.to_numpy()
+                lg_na = series.isna().to_numpy()
+            n_valid = len(values) - int(lg_na.sum())
+
+            if (n_valid == len(values)) and series.is_monotonic_increasing:
+                order = None
+            else:
+                order = np.argsort(values, kind="stable")
+                values = values[order]
+            self._sorted_index[ky] = (values, order, n_valid)
+        return self._sorted_index[ky]
+
+    def _select_rows(
+            self,
+            group: str,
+            column: str,
+            start: int | datetime.datetime = None,
+            stop: int | datetime.datetime = None
+    ) -> Union[slice, np.ndarray]:
+        """positions of the rows whose values of a column lie in [start, stop) (missing values are excluded)"""
+        values, order, n_valid = self._get_sorted_index(group, column)
+        if column == "Time":
+            tz = self.data[group][column].dt.tz
+            start, stop = (None if el is None else _to_unix_time(el, tz) for el in (start, stop))
+
+        lo = 0 if start is None else int(np.searchsorted(values[:n_valid], start, side="left"))
+        if stop is not None:
+            hi = int(np.searchsorted(values[:n_valid], stop, side="left"))
+        else:
+            hi = len(values) if start is None else n_valid
+        hi = max(lo, hi)
+
+        if order is None:
+            return slice(lo, hi)
+        # keep the original order of the rows
+        return np.sort(order[lo:hi])
+
+    @property
+    def clock(self) -> ClockModel:
+        """clock model that maps HFProbeCounter values to time (fitted from HFTimestamp on first use)"""
+        if self._clock is None:
+            if "HFTimestamp" not in self.data:
+                raise Exception("Group HFTimestamp not in data. No clock model available.")
+            self._clock = ClockModel.from_timestamps(self.data["HFTimestamp"], self.timeinfo)
+        return self._clock
 
     def keys(self) -> dict_keys:
         return self.data.keys()
@@ -110,19 +587,10 @@ class CapturePayload:
         return self.keys()
 
     def group_signals(self, key: str = None) -> Union[Dict[str, List[str]], Dict[str, Dict[str, List[str]]]]:
-        if key in self._grouped_signals:
-            return self._grouped_signals[key]
+        if key in self.data:
+            return self.catalog(key).heads
         else:
-            return self._grouped_signals
-
-
-    @staticmethod
-    def _group_signals(data: Dict[str, pd.DataFrame]):
-        # group signals
-        grouped: Dict[str, Dict[str, List[str]]] = dict()
-        for ky, df in data.items():
-            grouped[ky] = group_signal_names(df.columns)
-        return grouped
+            return {ky: self.catalog(ky).heads for ky in self.data}
 
     def groupby(
             self,
@@ -131,18 +599,86 @@ class CapturePayload:
             **kwargs
     ) -> pd.DataFrame:
         # query data
-        keys = self._grouped_signals[group][key]
+        keys = self.catalog(group).heads[key]
         df = self.get_item(group, keys, **kwargs)
         return df
 
     def hash_g_code(self) -> str:
-        group = "HFBlockEvent"
-        key = "GCode"
-        if group not in self.data:
-            raise Exception(f"Group {group} not in data. No G-Code hashing available.")
-        if key not in self.data[group]:
-            raise Exception(f"Signal {key} not in data['{group}']. No G-Code hashing available.")
-        return hash_list(self[group, key])
+        if self.fingerprints.get("g_code") is None:
+            group = "HFBlockEvent"
+            key = "GCode"
+            if group not in self.data:
+                raise Exception(f"Group {group} not in data. No G-Code hashing available.")
+            if key not in self.data[group]:
+                raise Exception(f"Signal {key} not in data['{group}']. No G-Code hashing available.")
+            self.fingerprints["g_code"] = hash_list(self[group, key])
+        return self.fingerprints["g_code"]
+
+    def memory_report(
+            self,
+            by: Literal["column", "group"] = "column",
+            deep: bool = True
+    ) -> pd.DataFrame:
+        """
+        memory footprint of the data. Groups that were not built yet (lazy mode) are not reported.
+        :param by: "column": bytes, dtype and share of the group per column (the index is reported as column "Index"),
+        "group": bytes and share of object / string columns per group
+        :param deep: include the python objects of object and string columns (otherwise only their pointers are counted)
+        :return: DataFrame indexed by group and column or by group, sorted by the number of bytes
+        """
+        rows = []
+        for group in self.data:
+            if isinstance(self.data, LazyGroups) and not self.data.is_loaded(group):
+                continue
+            df = self.data[group]
+            n_bytes = df.memory_usage(index=True, deep=deep)
+            dtypes = pd.concat([pd.Series({"Index": df.index.dtype}), df.dtypes])
+            for column, vl in n_bytes.items():
+                dtype = dtypes[column]
+                rows.append({
+                    "group": group,
+                    "column": column,
+                    "dtype": str(dtype),
+                    "rows": len(df),
+                    "bytes": int(vl),
+                    "object": pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+                })
+        report = pd.DataFrame(rows, columns=["group", "column", "dtype", "rows", "bytes", "object"])
+
+        if by == "group":
+            report["object_bytes"] = report["bytes"].where(report["object"], 0)
+            report = report.groupby("group", sort=False).agg(
+                rows=("rows", "first"),
+                columns=("column", "size"),
+                bytes=("bytes", "sum"),
+                object_bytes=("object_bytes", "sum")
+            )
+            # the index is not a column
+            report["columns"] -= 1
+            report["object_share"] = report["object_bytes"] / report["bytes"]
+        elif by == "column":
+            report["share"] = report["bytes"] / report.groupby("group", sort=False)["bytes"].transform("sum")
+            report = report.set_index(["group", "column"])
+        else:
+            raise Exception(f"Unknown value by={by}. Use 'column' or 'group'.")
+        return report.sort_values("bytes", ascending=False)
+
+
+def _to_unix_time(t: Union[datetime.datetime, pd.Timestamp, str], tz) -> int:
+    """nanoseconds since epoch of a time bound (naive times are assumed to be in the time zone of the data)"""
+    t = pd.Timestamp(t)
+    if (t.tzinfo is None) and (tz is not None):
+        t = t.tz_localize(tz)
+    elif (t.tzinfo is not None) and (tz is None):
+        t = t.tz_convert("UTC").tz_localize(None)
+    return t.as_unit("ns").value
+
+
+def get_columns(df: pd.DataFrame) -> List[str]:
+    """names of the signals of a table (the addresses are the columns of LFData in long format)"""
+    if is_long_format(df):
+        return list(pd.unique(df["Address"])) + [el for el in ("Time", "HFProbeCounter") if el in df]
+    return list(df.columns)
 
 
 def group_signal_names(signals: List[SignalHeaderHF] | List[SignalHeaderLF] | List[str]):
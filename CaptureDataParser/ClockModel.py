@@ -0,0 +1,438 @@
+from pydantic import BaseModel
+import numpy as np
+import pandas as pd
+import warnings
+from datetime import tzinfo
+
+from typing import List, Union, Literal
+
+from CaptureDataParser.HeaderData import TimeInfo
+from CaptureDataParser.utils import interplin, to_unix_time, to_unix_times, is_utc
+
+
+"""
+This file contains the clock model that maps the HF probe counter of the NC to time. It is fitted from the
+HFTimestamp messages of a recording (and the initial time of the header).
+"""
+
+
+class ClockSegment(BaseModel):
+    # number of counter resets before this segment
+    epoch: int
+    # first and last counter of the support points
+    start_counter: int
+    stop_counter: int
+    # time (ns since epoch) at start_counter
+    intercept: int
+    # nanoseconds per count
+    slope: float
+    # support points (without outliers) and their residuals (ns)
+    n_points: int
+    rms: float
+    max_abs: float
+
+    @property
+    def cycle_time(self) -> float:
+        """cycle time in milliseconds"""
+        return self.slope / 1e6
+
+
+def count_resets(counter: np.ndarray, min_reset: int) -> np.ndarray:
+    """
+    number of counter resets before each element (a reset is a drop of the counter by more than min_reset)
+    :param counter: counter values in the order of the recording
+    :param min_reset: minimum drop of the counter to be a reset
+    :return: epoch of each element
+    """
+    if len(counter) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(([0], np.cumsum(np.diff(counter) < -min_reset)))
+
+
+class ClockModel:
+    """
+    Piecewise linear model of the time of the HF probe counter. The counter may be reset (epochs) and the clock may
+    jump (segments within an epoch). Each segment is a linear fit with its own cycle time (drift), timestamps that
+    deviate from their neighbors are ignored as outliers.
+    """
+    def __init__(
+            self,
+            counter: np.ndarray,
+            time: np.ndarray,
+            inliers: np.ndarray,
+            segments: List[ClockSegment],
+            tz: Union[tzinfo, None] = None,
+            nominal_cycle_time: float = None,
+            min_reset: int = 1000
+    ) -> None:
+        """
+        :param counter: counter of the support points (in the order of the recording)
+        :param time: time of the support points (ns since epoch)
+        :param inliers: boolean mask of the support points that are no outliers
+        :param segments: fitted segments
+        :param tz: time zone of the returned time
+        :param nominal_cycle_time: cycle time of the header (ms)
+        :param min_reset: minimum drop of the counter to be a reset
+        """
+        self.counter = counter
+        self.time = time
+        self.inliers = inliers
+        self.segments = segments
+        self.tz = tz
+        self.nominal_cycle_time = nominal_cycle_time
+        self.min_reset = min_reset
+        self.epoch = count_resets(counter, min_reset)
+
+    def __repr__(self) -> str:
+        return (
+            f"ClockModel(cycle_time={self.cycle_time:.6f} ms, segments={len(self.segments)}, "
+            f"resets={self.n_resets}, outliers={self.n_outliers}, rms={self.rms / 1e6:.3f} ms)"
+        )
+
+    @classmethod
+    def fit(
+            cls,
+            counter: Union[np.ndarray, List[int]],
+            time: Union[np.ndarray, List[int]],
+            tz: Union[tzinfo, None] = None,
+            nominal_cycle_time: float = None,
+            tolerance: float = 5,
+            min_step: float = 10,
+            min_reset: int = 1000
+    ) -> "ClockModel":
+        """
+        fits the model to support points
+        :param counter: counter values in the order of the recording
+        :param time: time of the counter values (ns since epoch)
+        :param tz: time zone of the returned time
+        :param nominal_cycle_time: cycle time of the header (ms)
+        :param tolerance: changes of the residual larger than tolerance times their robust standard deviation are
+        either outliers (if they return immediately) or jumps of the clock
+        :param min_step: minimum change of the residual (in cycles) to be an outlier or a jump
+        :param min_reset: minimum drop of the counter to be a reset
+        :return: fitted model
+        """
+        counter = np.asarray(counter, dtype=np.int64)
+        time = np.asarray(time, dtype=np.int64)
+        if len(counter) == 0:
+            raise Exception("No timestamps to fit a clock model.")
+
+        epochs = count_resets(counter, min_reset)
+        inliers = np.ones(len(counter), dtype=bool)
+        segments = []
+        for epoch in range(epochs[-1] + 1):
+            idx = np.flatnonzero(epochs == epoch)
+            if len(idx) == 0:
+                continue
+            idx = idx[np.argsort(counter[idx], kind="stable")]
+            x = counter[idx]
+            y = time[idx]
+
+            # robust cycle time: median slope between consecutive support points
+            dx = np.diff(x)
+            lg = dx > 0
+            if lg.any():
+                slope = float(np.median(np.diff(y)[lg] / dx[lg]))
+            elif nominal_cycle_time is not None and nominal_cycle_time > 0:
+                slope = nominal_cycle_time * 1e6
+            else:
+                slope = 0.0
+
+            # changes of the residual between consecutive support points
+            residual = (y - y[0]).astype(np.float64) - slope * (x - x[0])
+            d = np.diff(residual)
+            scale = 1.4826 * np.median(np.abs(d - np.median(d))) if len(d) > 0 else 0
+            threshold = max(tolerance * scale, min_step * abs(slope))
+
+            outliers = np.zeros(len(x), dtype=bool)
+            breaks = []
+            skip = -1
+            for j in np.flatnonzero(np.abs(d) > threshold):
+                if j == skip:
+                    continue
+                if (j + 1 < len(d)) and (np.abs(d[j] + d[j + 1]) <= threshold) and (np.abs(d[j + 1]) > threshold):
+                    # spike: a single timestamp deviates
+                    outliers[j + 1] = True
+                    skip = j + 1
+                else:
+                    # step: the clock (or the counter) jumped
+                    breaks.append(j + 1)
+            inliers[idx[outliers]] = False
+
+            # fit a line per segment
+            for start, stop in zip([0] + breaks, breaks + [len(x)]):
+                lg = ~outliers[start:stop]
+                xs = x[start:stop][lg]
+                ys = y[start:stop][lg]
+                if len(xs) == 0:
+                    continue
+                yr = (ys - ys[0]).astype(np.float64)
+                if (len(xs) > 1) and (xs[-1] > xs[0]):
+                    slope_seg, intercept = np.polyfit((xs - xs[0]).astype(np.float64), yr, 1)
+                else:
+                    slope_seg, intercept = slope, float(np.mean(yr))
+                residual = yr - (intercept + slope_seg * (xs - xs[0]))
+                segments.append(
+                    ClockSegment(
+                        epoch=epoch,
+                        start_counter=int(xs[0]),
+                        stop_counter=int(xs[-1]),
+                        intercept=int(ys[0] + np.rint(intercept)),
+                        slope=float(slope_seg),
+                        n_points=len(xs),
+                        rms=float(np.sqrt(np.mean(residual ** 2))),
+                        max_abs=float(np.max(np.abs(residual))),
+                    )
+                )
+
+        model = cls(
+            counter=counter,
+            time=time,
+            inliers=inliers,
+            segments=segments,
+            tz=tz,
+            nominal_cycle_time=nominal_cycle_time,
+            min_reset=min_reset
+        )
+        # plausibility check with the cycle time of the header
+        if (nominal_cycle_time is not None) and (nominal_cycle_time > 0) and (model.drift is not None):
+            if abs(model.drift) > 0.1:
+                warnings.warn(
+                    f"Fitted HF cycle time {model.cycle_time:.4f} ms deviates from the cycle time of the header "
+                    f"({nominal_cycle_time} ms)."
+                )
+        return model
+
+    @classmethod
+    def from_timestamps(cls, timestamps: pd.DataFrame, initial_time: TimeInfo = None, **kwargs) -> "ClockModel":
+        """
+        fits the model to the HFTimestamp messages of a recording
+        :param timestamps: HFTimestamp table (Time, HFProbeCounter)
+        :param initial_time: time info of the header (the initial counter and time are added as support point)
+        :param kwargs: see fit()
+        :return: fitted model
+        """
+        lg = timestamps["Time"].notna().to_numpy() & timestamps["HFProbeCounter"].notna().to_numpy()
+        counter = timestamps["HFProbeCounter"].to_numpy()[lg].astype(np.int64)
+        time = to_unix_times(timestamps["Time"][lg])
+        # keep info on time zone localization
+        tz = timestamps["Time"].dt.tz
+
+        nominal_cycle_time = None
+        if initial_time is not None:
+            if (initial_time.hf_cycle_time is not None) and (initial_time.hf_cycle_time > 0):
+                nominal_cycle_time = initial_time.hf_cycle_time
+
+            xp0 = initial_time.start_counter
+            if (xp0 is not None) and (xp0 >= 0) and ((len(counter) == 0) or (xp0 != counter[0])):
+                counter = np.append(xp0, counter)
+                time = np.append(to_unix_time(initial_time.start_time), time)
+
+        return cls.fit(counter, time, tz=tz, nominal_cycle_time=nominal_cycle_time, **kwargs)
+
+    @property
+    def n_resets(self) -> int:
+        return int(self.epoch[-1]) if len(self.epoch) > 0 else 0
+
+    @property
+    def n_outliers(self) -> int:
+        return int(np.sum(~self.inliers))
+
+    @property
+    def cycle_time(self) -> float:
+        """fitted cycle time in milliseconds (segments weighted by their counter range)"""
+        span = np.array([el.stop_counter - el.start_counter for el in self.segments], dtype=np.float64)
+        slope = np.array([el.slope for el in self.segments])
+        if span.sum() > 0:
+            return float(np.sum(slope * span) / span.sum()) / 1e6
+        return float(np.median(slope)) / 1e6
+
+    @property
+    def drift(self) -> Union[float, None]:
+        """relative deviation of the fitted cycle time from the cycle time of the header"""
+        if (self.nominal_cycle_time is None) or (self.nominal_cycle_time <= 0):
+            return None
+        return self.cycle_time / self.nominal_cycle_time - 1
+
+    @property
+    def rms(self) -> float:
+        """root mean square of the residuals of all support points without outliers (ns)"""
+        n = sum(el.n_points for el in self.segments)
+        return float(np.sqrt(sum(el.rms ** 2 * el.n_points for el in self.segments) / n)) if n > 0 else 0.0
+
+    @property
+    def max_abs(self) -> float:
+        """maximum absolute residual of all support points without outliers (ns)"""
+        return max((el.max_abs for el in self.segments), default=0.0)
+
+    def epoch_bounds(self, extend: bool = False) -> np.ndarray:
+        """
+        range of the counter values of each epoch
+        :param extend: extend the range of the timestamps of an epoch by the counts until the timestamps of the
+        neighboring epochs (i.e. until the reset at the latest). The first epoch is extended below by the largest step
+        between its timestamps, the last epoch is unbounded above.
+        :return: array of shape (number of epochs, 2) with the lower and upper bound
+        """
+        n_epochs = self.n_resets + 1
+        bounds = np.empty((n_epochs, 2), dtype=np.float64)
+        x, t, epoch = self.counter, self.time, self.epoch
+        for e in range(n_epochs):
+            lg = (epoch == e) & self.inliers
+            lg = lg if lg.any() else (epoch == e)
+            bounds[e] = x[lg].min(), x[lg].max()
+            if not extend:
+                continue
+
+            slopes = [el.slope for el in self.segments if el.epoch == e]
+            # nanoseconds per count (unbounded if unknown)
+            slope = float(np.median(slopes)) if slopes else 0.0
+            slope = slope if slope > 0 else self.cycle_time * 1e6
+            if e == 0:
+                # the recording starts with the first timestamps
+                steps = np.diff(np.sort(x[lg]))
+                bounds[e, 0] -= steps.max() if len(steps) > 0 else 0
+            else:
+                gap = max(t[lg].min() - t[epoch == e - 1].max(), 0)
+                bounds[e, 0] -= gap / slope if slope > 0 else np.inf
+            if e == n_epochs - 1:
+                bounds[e, 1] = np.inf
+            else:
+                gap = max(t[epoch == e + 1].min() - t[lg].max(), 0)
+                bounds[e, 1] += gap / slope if slope > 0 else np.inf
+        return bounds
+
+    def epochs(self, counter: np.ndarray, epoch: int = None) -> np.ndarray:
+        """
+        assigns counter values (in the order of the recording) to the epochs of the model. Resets within the values
+        start the next epoch. If the values do not span all epochs (e.g. counters after a reset only), the epoch of
+        each run between resets is determined by the counter ranges of the epochs: the epochs whose timestamps cover
+        the run or, if there are none, whose extended range contains it (see epoch_bounds()).
+        :param counter: counter values
+        :param epoch: epoch of the first value (determined by the counter ranges if None)
+        :return: epoch of each value
+        """
+        counter = np.asarray(counter, dtype=np.float64)
+        if self.n_resets == 0:
+            return np.zeros(len(counter), dtype=np.int64)
+        runs = count_resets(counter, self.min_reset)
+        if epoch is not None:
+            return np.minimum(epoch + runs, self.n_resets)
+        n_runs = int(runs[-1]) + 1 if len(runs) > 0 else 0
+        if (n_runs >= self.n_resets + 1) or np.isnan(counter).all():
+            # all epochs (further resets without timestamps continue the last epoch)
+            return np.minimum(runs, self.n_resets)
+
+        # epochs whose range contains all values of a run
+        bounds = self.epoch_bounds()
+        bounds_extended = self.epoch_bounds(extend=True)
+        candidates = []
+        for k in range(n_runs):
+            # resets are only found between valid values, i.e. every run has valid values
+            values = counter[runs == k]
+            values = values[~np.isnan(values)]
+            lg = (bounds[:, 0] <= values.min()) & (values.max() <= bounds[:, 1])
+            if not lg.any():
+                lg = (bounds_extended[:, 0] <= values.min()) & (values.max() <= bounds_extended[:, 1])
+            candidates.append(lg)
+
+        # earliest and latest assignment of the runs to increasing epochs
+        first = []
+        for lg in candidates:
+            offset = first[-1] + 1 if first else 0
+            e = np.flatnonzero(lg[offset:])
+            if len(e) == 0:
+                raise Exception(
+                    "Counter values do not lie within the counter ranges of the epochs of the clock model. Pass the "
+                    "epoch of the first value."
+                )
+            first.append(offset + int(e[0]))
+        last = []
+        for lg in candidates[::-1]:
+            e = np.flatnonzero(lg[:(last[-1] if last else len(lg))])
+            last.append(int(e[-1]))
+        if first != last[::-1]:
+            raise Exception(
+                "Counter values match the counter ranges of several epochs of the clock model (e.g. counters after a "
+                "reset). Pass the epoch of the first value."
+            )
+        return np.array(first, dtype=np.int64)[runs]
+
+    def interpolate(self, counter: Union[np.ndarray, List[int]], epoch: int = None) -> np.ndarray:
+        """
+        piecewise linear interpolation between the timestamps (without outliers) per epoch
+        :param counter: counter values in the order of the recording
+        :param epoch: epoch of the first value (see epochs())
+        :return: time (ns since epoch) as int64 (float64 if a counter is missing)
+        """
+        counter = np.asarray(counter, dtype=np.float64)
+        epochs = self.epochs(counter, epoch)
+        epochs_model = self.epoch[self.inliers]
+
+        y = None
+        for epoch in np.unique(epochs):
+            lg = epochs == epoch
+            lg_model = epochs_model == epoch
+            if not lg_model.any():
+                # no timestamps in this epoch: use the last epoch with timestamps
+                lg_model = epochs_model == epochs_model[epochs_model < epoch].max()
+            y_epoch = interplin(counter[lg], self.counter[self.inliers][lg_model], self.time[self.inliers][lg_model])
+            if y is None:
+                y = np.empty(len(counter), dtype=y_epoch.dtype)
+            elif y.dtype != y_epoch.dtype:
+                y = y.astype(np.float64)
+            y[lg] = y_epoch
+        return y if y is not None else np.zeros(0, dtype=np.int64)
+
+    def evaluate(self, counter: Union[np.ndarray, List[int]], epoch: int = None) -> np.ndarray:
+        """
+        evaluates the fitted segments (the segment that starts before a counter value; extrapolated linearly)
+        :param counter: counter values in the order of the recording
+        :param epoch: epoch of the first value (see epochs())
+        :return: time (ns since epoch) as int64 (float64 if a counter is missing)
+        """
+        counter = np.asarray(counter, dtype=np.float64)
+        epochs = self.epochs(counter, epoch)
+
+        epoch_seg = np.array([el.epoch for el in self.segments])
+        start = np.array([el.start_counter for el in self.segments], dtype=np.float64)
+        intercept = np.array([el.intercept for el in self.segments], dtype=np.int64)
+        slope = np.array([el.slope for el in self.segments])
+
+        # segment per value: last segment of the epoch that starts at or before the counter value
+        seg = np.zeros(len(counter), dtype=np.int64)
+        for epoch in np.unique(epochs):
+            lg = epochs == epoch
+            candidates = np.flatnonzero(epoch_seg == epoch)
+            if len(candidates) == 0:
+                # no timestamps in this epoch: use the last epoch with timestamps
+                candidates = np.flatnonzero(epoch_seg == epoch_seg[epoch_seg < epoch].max())
+            k = np.searchsorted(start[candidates], counter[lg], side="right") - 1
+            seg[lg] = candidates[np.clip(k, 0, len(candidates) - 1)]
+
+        dt = slope[seg] * (counter - start[seg])
+        if np.isfinite(dt).all():
+            return intercept[seg] + np.rint(dt).astype(np.int64)
+        return intercept[seg] + dt
+
+    def to_datetime(
+            self,
+            counter: Union[np.ndarray, List[int], pd.Series],
+            method: Literal["fit", "interpolate"] = "fit",
+            epoch: int = None
+    ) -> pd.DatetimeIndex:
+        """
+        maps counter values to time
+        :param counter: counter values in the order of the recording
+        :param method: evaluate the fitted segments ("fit") or interpolate between the timestamps ("interpolate")
+        :param epoch: epoch of the first value, i.e. the number of counter resets before it (determined by the counter
+        ranges of the epochs if None, see epochs())
+        :return: time in the time zone of the timestamps
+        """
+        counter = np.asarray(counter, dtype=np.float64)
+        y = self.interpolate(counter, epoch) if method == "interpolate" else self.evaluate(counter, epoch)
+
+        time = pd.to_datetime(y, utc=self.tz is not None)
+        if (self.tz is not None) and not is_utc(self.tz):
+            # convert to non-UTC time zone
+            time = time.tz_convert(self.tz)
+        return time
@@ -0,0 +1,71 @@
+import numpy as np
+
+from typing import List, Dict, Any, Union
+
+from CaptureDataParser.utils import ListHash
+
+
+class Fingerprints:
+    """
+    Hashes of the G-code of a recording that are computed while the recording is decoded. The hash of all G-code
+    blocks is identical to CapturePayload.hash_g_code() (i.e. utils.hash_list of HFBlockEvent["GCode"]). Optionally,
+    the G-code blocks are hashed per active tool and per call-stack path (HFCallEvent). A block belongs to the path of
+    the last call at or before its HFProbeCounter.
+    """
+    kinds = ("tool", "path")
+
+    def __init__(self, kinds: List[str] = None) -> None:
+        """
+        :param kinds: additional fingerprints: "tool" (hash per active tool), "path" (hash per call-stack path)
+        """
+        kinds = list(kinds) if kinds is not None else []
+        unknown = set(kinds) - set(self.kinds)
+        if unknown:
+            raise Exception(f"Unknown fingerprints {unknown}. Use {self.kinds}.")
+        self.kinds_selected = kinds
+
+        self.g_code = ListHash()
+        # the column GCode exists in at least one block
+        self.has_g_code = False
+        self.tool: Dict[str, ListHash] = dict()
+        self.path: Dict[str, ListHash] = dict()
+        # path of the last call (carried over to the next part of a recording)
+        self._path = None
+
+    def update(self, blocks: List[Dict[str, Any]], calls: List[Dict[str, Any]] = None) -> None:
+        """
+        adds the next HFBlockEvent and HFCallEvent messages (e.g. of the next part of a chained recording)
+        :param blocks: HFBlockEvent messages in the order of the recording
+        :param calls: HFCallEvent messages in the order of the recording
+        """
+        # missing and null GCode are NaN, as in the column HFBlockEvent["GCode"]
+        g_code = [np.nan if el.get("GCode") is None else el["GCode"] for el in blocks]
+        self.has_g_code |= any("GCode" in el for el in blocks)
+        self.g_code.update(g_code)
+
+        if "tool" in self.kinds_selected:
+            for gc, el in zip(g_code, blocks):
+                self.tool.setdefault(str(el.get("ActiveTool")), ListHash()).append(gc)
+
+        if ("path" in self.kinds_selected) and (calls is not None):
+            counter = np.array([el.get("HFProbeCounter", -1) for el in calls], dtype=np.int64)
+            order = np.argsort(counter, kind="stable")
+            paths = [self._path] + [calls[i].get("Path") for i in order]
+            # position of the last call at or before the counter of each block (0: call of a previous part)
+            idx = np.searchsorted(counter[order], [el.get("HFProbeCounter", -1) for el in blocks], side="right")
+            for gc, i in zip(g_code, idx):
+                if paths[i] is not None:
+                    self.path.setdefault(str(paths[i]), ListHash()).append(gc)
+            self._path = paths[-1]
+
+    def to_dict(self) -> Dict[str, Union[str, Dict[str, str], None]]:
+        """
+        :return: "g_code": hash of all G-code blocks (None if there is no GCode), "tool" / "path": hash per tool / path
+        (if selected)
+        """
+        fingerprints = {"g_code": self.g_code.hexdigest() if self.has_g_code else None}
+        if "tool" in self.kinds_selected:
+            fingerprints["tool"] = {ky: vl.hexdigest() for ky, vl in self.tool.items()}
+        if "path" in self.kinds_selected:
+            fingerprints["path"] = {ky: vl.hexdigest() for ky, vl in self.path.items()}
+        return fingerprints
@@ -0,0 +1,45 @@
+from pydantic import BaseModel
+from pathlib import Path
+
+from typing import Optional, List, Any
+
+
+"""
+This file contains the Pydantic data models used to model the footer of a message of Capture4Analysis data file and
+the chain of files that make up a recording.
+Capture4Analysis is a data recorder for Siemens SINUMERIK Edge and a Siemens trademark.
+"""
+
+
+class FilePathChain(BaseModel):
+    # {'Previous': None, 'Actual': 'example.json', 'Next': None, 'Index': 1, 'StreamIndex': None}
+    previous: Optional[str] = None
+    actual: str
+    next: Optional[str] = None
+    index: Optional[int] = None
+    stream_index: Optional[int] = None
+
+
+class FooterData(BaseModel):
+    """
+    Represents the footer of a recording by the software Capture4Analysis.
+    """
+    error_messages: List[Any] = []
+    file_path_chain: FilePathChain
+
+
+class RecordingChain(BaseModel):
+    """
+    Files of a folder that belong to the same (chained) recording.
+    """
+    folder: Path
+    # existing files in the order of the recording
+    files: List[Path]
+    # file names that are referenced by the chain but do not exist
+    missing: List[str] = []
+    # links (file names) that contradict each other, e.g. a "Next" file that does not point back
+    inconsistent: List[str] = []
+
+    @property
+    def complete(self) -> bool:
+        return (len(self.missing) == 0) and (len(self.inconsistent) == 0)
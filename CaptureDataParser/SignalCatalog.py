@@ -0,0 +1,95 @@
+import re
+
+from typing import List, Dict, Iterable, Union
+
+from CaptureDataParser.utils import get_signal_name_head
+
+
+# indexed SINUMERIK variables, e.g. /Channel/Parameter/R[u1,1] or /Nck/State/aaIm[X1]
+re_indexed_variable = re.compile(r"(.+)\[([^\[\]]*)\]$")
+
+
+class SignalCatalog:
+    """
+    Index of the signal names of a data group. The names are indexed by their exact name, their name head (everything
+    before the axis suffix, e.g. "CURRENT" of "CURRENT|X1"), their axis suffix ("1", "X1", "SP1") and the base name of
+    indexed variables ("/Channel/Parameter/R" of "/Channel/Parameter/R[u1,1]"). Resolved regex patterns are memoized,
+    i.e. repeated queries do not scan the names again.
+    """
+    def __init__(self, columns: Iterable[str]) -> None:
+        """
+        :param columns: signal names in the order of the columns
+        """
+        self.columns: List[str] = list(columns)
+        self._position: Dict[str, int] = {name: i for i, name in enumerate(self.columns)}
+
+        self.heads: Dict[str, List[str]] = dict()
+        self.axes: Dict[str, List[str]] = dict()
+        self.variables: Dict[str, List[str]] = dict()
+        for name in self.columns:
+            head = get_signal_name_head(name)
+            self.heads.setdefault(head, []).append(name)
+            if head != name:
+                self.axes.setdefault(name[len(head) + 1:], []).append(name)
+
+            m = re_indexed_variable.match(name)
+            if m is not None:
+                self.variables.setdefault(m.group(1), []).append(name)
+
+        # memoized pattern -> matching names
+        self._resolved: Dict[str, List[str]] = dict()
+
+    def __repr__(self) -> str:
+        return f"SignalCatalog(columns={len(self.columns)}, heads={len(self.heads)})"
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._position
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def resolve(self, pattern: str) -> List[str]:
+        """
+        all names that match a name or regex pattern (re.match). A pattern that is identical to a name selects only
+        this name.
+        :param pattern: name or regex pattern
+        :return: matching names in the order of the columns
+        """
+        if pattern in self._position:
+            return [pattern]
+        if pattern not in self._resolved:
+            re_pattern = re.compile(pattern)
+            self._resolved[pattern] = [el for el in self.columns if re_pattern.match(el)]
+        return self._resolved[pattern]
+
+    def first(self, pattern: str) -> Union[str, None]:
+        """
+        first name that matches a name or regex pattern (same as utils.check_key_pattern)
+        :param pattern: name or regex pattern
+        :return: name or None if no name matches
+        """
+        names = self.resolve(pattern)
+        return names[0] if names else None
+
+    def head(self, head: str) -> List[str]:
+        """names with a given name head, e.g. "CURRENT" -> ["CURRENT|1", "CURRENT|2", ...]"""
+        return self.heads.get(head, [])
+
+    def axis(self, suffix: str) -> List[str]:
+        """names with a given axis suffix, e.g. "1" -> ["CURRENT|1", "TORQUE|1", ...] (case-insensitive)"""
+        if suffix in self.axes:
+            return self.axes[suffix]
+        return [el for ky, vl in self.axes.items() if ky.lower() == suffix.lower() for el in vl]
+
+    def variable(self, name: str, index: str = None) -> List[str]:
+        """
+        indexed variables of a given base name
+        :param name: base name, e.g. "/Channel/Parameter/R"
+        :param index: only this index, e.g. "u1,1" (all indices if None)
+        :return: names of the variables
+        """
+        names = self.variables.get(name, [])
+        if index is not None:
+            index = index.replace(" ", "")
+            names = [el for el in names if el[len(name) + 1:-1].replace(" ", "") == index]
+        return names
@@ -1,6 +1,10 @@
 # classes and data models
 from .CapturePayload import CapturePayload
 from .HeaderData import (HeaderData, SignalHeaderLF, SignalHeaderHF)
+from .cache import ParseCache
+from .ClockModel import ClockModel
+from .SignalCatalog import SignalCatalog
+from .Fingerprints import Fingerprints
 
 # parsers
 from .parse import parse
@@ -16,6 +20,10 @@ __all__ = [
     "CapturePayload",
     "HeaderData",
     "SignalHeaderLF",
+    "ParseCache",
+    "ClockModel",
+    "SignalCatalog",
+    "Fingerprints",
     "parse",
     "parse_header",
     "parse_payload",
@@ -0,0 +1,268 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import pickle
+import struct
+import time
+import logging
+from functools import partial, lru_cache
+from itertools import accumulate
+
+from typing import Union, List, Dict, Any, Callable, Tuple
+
+from CaptureDataParser.CapturePayload import CapturePayload
+
+
+# increment if the decoded data changes (invalidates all entries)
+CACHE_VERSION = 4
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed recordings. Entries are keyed by the content of the files of a recording and the parse
+    options. The content hash of a file is only recomputed if its size or modification time changed. Entries are
+    written atomically and guarded by lock files so that several processes can share a cache directory. The least
+    recently used entries are evicted if the cache exceeds its maximum size.
+
+    An entry holds the groups of a recording as separate pickles after an index (shapes, clock model, G-code
+    fingerprints, offsets of the groups) so that a single group can be loaded without reading the others.
+
+    Loading an entry unpickles it, i.e. it may execute code: the cache directory must be trusted and only writable by
+    the users of the cache (it is created with the permissions 0700).
+    """
+    suffix = ".pkl"
+
+    def __init__(
+            self,
+            directory: Union[Path, str],
+            max_size: int = 2 ** 34,
+            lock_timeout: float = 600
+    ) -> None:
+        """
+        :param directory: cache directory (created if it does not exist, must be trusted)
+        :param max_size: maximum size of all entries in bytes
+        :param lock_timeout: seconds to wait for another process that writes the same entry (older locks are stale)
+        """
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.lock_timeout = lock_timeout
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        (self.directory / "files").mkdir(mode=0o700, exist_ok=True)
+        if (os.name == "posix") and (self.directory.stat().st_mode & 0o022):
+            logging.warning(
+                f"ParseCache: {self.directory} is writable by other users. Its entries are unpickled when loaded, use a "
+                f"directory that only you can write to."
+            )
+
+    def file_hash(self, file: Union[Path, str]) -> str:
+        """
+        content hash of a file. Uses the hash of a previous call if the size and modification time did not change.
+        :param file: path to the file
+        :return: hash string
+        """
+        file = Path(file).resolve()
+        stat = file.stat()
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        record = self.directory / "files" / f"{hashlib.sha256(file.as_posix().encode()).hexdigest()}.json"
+        try:
+            with open(record, "r") as fid:
+                known = json.load(fid)
+            if {ky: known.get(ky) for ky in fingerprint} == fingerprint:
+                return known["hash"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        with open(file, "rb") as fid:
+            digest = hashlib.file_digest(fid, "sha256").hexdigest()
+        self._write_atomic(record, json.dumps({**fingerprint, "hash": digest}).encode())
+        return digest
+
+    def key(self, files: List[Union[Path, str]], options: Dict[str, Any]) -> str:
+        """
+        key of a recording: hash of the contents of its files (regardless of their order) and the parse options
+        :param files: files of a recording
+        :param options: parse options (JSON serializable)
+        :return: key string
+        """
+        hashes = sorted(self.file_hash(fl) for fl in files)
+        content = json.dumps({"version": CACHE_VERSION, "files": hashes, "options": options}, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def _write_atomic(self, file: Path, content: bytes) -> None:
+        """writes to a temporary file first and renames it (a reader never sees a partially written file)"""
+        tmp = file.with_name(f".{file.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as fid:
+                fid.write(content)
+            os.replace(tmp, file)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    @staticmethod
+    def _read_index(fid) -> Tuple[Dict[str, Any], int]:
+        """reads the index of an entry and returns it with the position where the groups start"""
+        n_bytes, = struct.unpack("<Q", fid.read(8))
+        return pickle.loads(fid.read(n_bytes)), 8 + n_bytes
+
+    @staticmethod
+    def _load_group(
+            entry: Path,
+            group: str,
+            offset: int,
+            n_bytes: int,
+            fallback: Callable[[], CapturePayload] = None
+    ) -> Any:
+        """loads a single group of an entry (or of the fallback if the entry was evicted in the meantime)"""
+        try:
+            with open(entry, "rb") as fid:
+                fid.seek(offset)
+                return pickle.loads(fid.read(n_bytes))
+        except FileNotFoundError:
+            if fallback is None:
+                raise Exception(f"ParseCache: entry {entry.name} was removed before all groups were loaded.")
+        logging.warning(f"ParseCache: entry {entry.name} was removed before all groups were loaded. Parsing again.")
+        return fallback().data[group]
+
+    def load(
+            self,
+            key: str,
+            lazy: bool = False,
+            fallback: Callable[[], CapturePayload] = None
+    ) -> Union[CapturePayload, None]:
+        """
+        loads an entry
+        :param key: key of the entry
+        :param lazy: load a group only when it is accessed for the first time
+        :param fallback: function that parses the recording if the entry is evicted before a group is loaded (lazy)
+        :return: CapturePayload or None if there is no (readable) entry
+        """
+        entry = self._entry(key)
+        try:
+            with open(entry, "rb") as fid:
+                index, start = self._read_index(fid)
+                if lazy:
+                    # parse at most once for all groups
+                    fallback = lru_cache(maxsize=None)(fallback) if fallback is not None else None
+                    data = {
+                        ky: partial(self._load_group, entry, ky, start + offset, n_bytes, fallback)
+                        for ky, (offset, n_bytes) in index["groups"].items()
+                    }
+                else:
+                    data = {ky: pickle.loads(fid.read(n_bytes)) for ky, (_, n_bytes) in index["groups"].items()}
+        except FileNotFoundError:
+            return None
+        except Exception as ex:
+            logging.warning(f"ParseCache: failed to load {entry.name} with exception: {ex}")
+            return None
+
+        # mark as recently used
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return CapturePayload(data, shapes=index["shapes"], clock=index["clock"], fingerprints=index["fingerprints"])
+
+    def store(self, key: str, payload: CapturePayload) -> None:
+        """
+        writes an entry and evicts the least recently used entries if the cache exceeds its maximum size
+        :param key: key of the entry
+        :param payload: parsed recording
+        """
+        groups = [pickle.dumps(vl, protocol=pickle.HIGHEST_PROTOCOL) for vl in payload.data.values()]
+        offsets = list(accumulate([0] + [len(el) for el in groups[:-1]]))
+        index = {
+            "shapes": payload.shapes,
+            # keep the clock model that was fitted with the initial time of the header
+            "clock": payload.clock if "HFTimestamp" in payload.data else None,
+            "fingerprints": payload.fingerprints,
+            "groups": {ky: (offset, len(el)) for ky, offset, el in zip(payload.data, offsets, groups)}
+        }
+        index = pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL)
+        self._write_atomic(self._entry(key), b"".join([struct.pack("<Q", len(index)), index] + groups))
+        self.evict()
+
+    def evict(self) -> None:
+        """removes the least recently used entries until the cache does not exceed its maximum size"""
+        entries = []
+        for fl in self.directory.glob(f"*{self.suffix}"):
+            try:
+                stat = fl.stat()
+            except OSError:
+                # removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, fl))
+
+        size = sum(el[1] for el in entries)
+        for _, n_bytes, fl in sorted(entries, key=lambda x: x[0]):
+            if size <= self.max_size:
+                break
+            try:
+                fl.unlink()
+            except OSError:
+                pass
+            size -= n_bytes
+
+    def _acquire(self, key: str) -> Union[Path, None]:
+        """creates the lock file of an entry. Returns None if another process holds the lock."""
+        lock = self.directory / f"{key}.lock"
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return lock
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > self.lock_timeout:
+                    # stale lock of a process that died
+                    lock.unlink()
+            except OSError:
+                pass
+            return None
+
+    def get(
+            self,
+            files: List[Union[Path, str]],
+            options: Dict[str, Any],
+            fnc: Callable[[], CapturePayload],
+            lazy: bool = False
+    ) -> CapturePayload:
+        """
+        returns the cached recording or parses it and stores the result
+        :param files: files of the recording
+        :param options: parse options (part of the key)
+        :param fnc: function that parses the recording
+        :param lazy: load a group of a cached recording only when it is accessed for the first time (the recording is
+        parsed again if its entry was evicted before)
+        :return: CapturePayload
+        """
+        key = self.key(files, options)
+        t0 = time.time()
+        while True:
+            payload = self.load(key, lazy=lazy, fallback=fnc)
+            if payload is not None:
+                return payload
+
+            lock = self._acquire(key)
+            if lock is not None:
+                # the entry may have been written in the meantime
+                payload = self.load(key, lazy=lazy, fallback=fnc)
+                if payload is not None:
+                    lock.unlink(missing_ok=True)
+                    return payload
+                break
+            elif time.time() - t0 > self.lock_timeout:
+                # give up waiting for the other process
+                return fnc()
+            # another process parses the same recording
+            time.sleep(0.1)
+
+        try:
+            payload = fnc()
+            self.store(key, payload)
+        finally:
+            lock.unlink(missing_ok=True)
+        return payload
@@ -1,14 +1,25 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from itertools import repeat
 import json
+import os
+import numpy as np
 import pandas as pd
 import logging
 
 from CaptureDataParser.parse_header import parse_header
-from CaptureDataParser.parse_payload import parse_payload
+from CaptureDataParser.parse_footer import read_footer, order_chain
+from CaptureDataParser.parse_payload import PayloadDecoder
+from CaptureDataParser.Fingerprints import Fingerprints
+from CaptureDataParser.stream import iter_capture_recording
 from CaptureDataParser.CapturePayload import CapturePayload
+from CaptureDataParser.cache import ParseCache
+from CaptureDataParser.HeaderData import HeaderData
+from CaptureDataParser.utils import MemoryTrace
 
-from typing import Union, List
-import warnings
+from typing import Union, List, Dict, Tuple, Any
 
 
 def read_json(file: Union[Path, str]) -> dict:
@@ -34,75 +45,304 @@ def read_capture_recording(file: Union[Path, str]) -> (dict, dict, dict):
     return header, payload, footer
 
 
+def decode_recording(
+        file: Union[Path, str],
+        rename_hfdata: bool = False,
+        components: List[str] = None,
+        decoder: PayloadDecoder = None,
+        signals: Dict[str, List[str]] = None,
+        fingerprints: List[str] = None,
+        trace: MemoryTrace = None
+) -> Tuple[HeaderData, PayloadDecoder, dict]:
+    """
+    decodes a single file of a recording while streaming it from disk. Payload messages are decoded as they are read;
+    rows that are not needed are skipped without decoding them.
+    :param file: path to the JSON file
+    :param rename_hfdata: rename the enumerated axes of HFData signals by their axis names
+    :param components: only decode these message types (decode all if None)
+    :param decoder: continue decoding into this decoder (e.g. previous part of a chained recording) if the signals
+    of its header match
+    :param signals: only decode these signals (names or regex patterns) per message type
+    :param fingerprints: additional G-code fingerprints ("tool", "path") of a new decoder
+    :param trace: trace the memory of the stages "read" (JSON), "header" and "decode" (payload)
+    :return: header, payload decoder, footer
+    """
+    def skip(key: str) -> bool:
+        return (head is not None) and decoder.skip(key)
+
+    stage = trace.stage if trace is not None else lambda name: nullcontext()
+    messages = iter_capture_recording(file, skip=skip)
+    if trace is not None:
+        messages = trace.iterate(messages, "read")
+
+    head, footer = None, None
+    pending = []
+    for key, value in messages:
+        if key == "Header":
+            with stage("header"):
+                head = parse_header(value)
+                if (decoder is None) or (decoder.signals_header != head.signals):
+                    decoder = PayloadDecoder(
+                        head.signals,
+                        rename_hfdata=rename_hfdata,
+                        components=components,
+                        signals=signals,
+                        fingerprints=decoder.fingerprints if decoder is not None else Fingerprints(fingerprints)
+                    )
+            # messages that were (unusually) stored before the header
+            with stage("decode"):
+                for msg in pending:
+                    decoder.feed(msg)
+            pending = []
+        elif key == "Payload":
+            if head is None:
+                pending.append(value)
+            else:
+                with stage("decode"):
+                    decoder.feed(value)
+        elif key == "Footer":
+            footer = value
+
+    if head is None:
+        raise Exception(f"No header found in {Path(file).name}.")
+    if footer is None:
+        raise Exception(f"No footer found in {Path(file).name}.")
+    with stage("decode"):
+        decoder.update_fingerprints()
+    return head, decoder, footer
+
+
+def parse_recording(
+        file: Union[Path, str],
+        rename_hfdata: bool = False,
+        components: List[str] = None,
+        signals: Dict[str, List[str]] = None
+) -> Tuple[HeaderData, Dict[str, pd.DataFrame], dict]:
+    """
+    parses a single file of a recording while streaming it from disk
+    :param file: path to the JSON file
+    :param rename_hfdata: rename the enumerated axes of HFData signals by their axis names
+    :param components: only decode these message types (decode all if None)
+    :param signals: only decode these signals (names or regex patterns) per message type
+    :return: header, decoded payload, footer
+    """
+    head, decoder, footer = decode_recording(file, rename_hfdata=rename_hfdata, components=components, signals=signals)
+    return head, decoder.to_frames(), footer
+
+
+def decode_part(
+        file: Union[Path, str],
+        rename_hfdata: bool = False,
+        components: List[str] = None,
+        signals: Dict[str, List[str]] = None
+) -> Tuple[HeaderData, Dict[str, Union[Dict[str, np.ndarray], List[Dict[str, Any]]]], Dict[str, int], dict]:
+    """
+    decodes a single file of a recording to column arrays instead of DataFrames (entry point for worker processes)
+    :param file: path to the JSON file
+    :param rename_hfdata: rename the enumerated axes of HFData signals by their axis names
+    :param components: only decode these message types (decode all if None)
+    :param signals: only decode these signals (names or regex patterns) per message type
+    :return: header, decoded columns, number of rows per message type, footer
+    """
+    head, decoder, footer = decode_recording(file, rename_hfdata=rename_hfdata, components=components, signals=signals)
+    return head, decoder.to_columns(), decoder.counts, footer
+
+
 def parse(
         files: Union[Union[Path, str], List[Union[Path, str]]],
-        rename_hfdata: bool = False
+        rename_hfdata: bool = False,
+        workers: int = 1,
+        groups: List[str] = None,
+        signals: Dict[str, List[str]] = None,
+        cache: Union[ParseCache, Path, str] = None,
+        lazy: bool = False,
+        fingerprints: List[str] = None,
+        trace_memory: bool = False
 ):
+    """
+    parses a (chained) recording
+    :param files: file or files of a recording
+    :param rename_hfdata: rename the enumerated axes of HFData signals by their axis names
+    :param workers: number of processes that decode the files of a chained recording in parallel (sequential if 1 or
+    None, at most one process per CPU). Only pays off on several CPUs for recordings of many large files: each process
+    has to send its decoded columns back, which costs more than decoding small files.
+    :param groups: only decode these groups (message types such as "HFData", "LFData", "HFBlockEvent"; all if None).
+    HFTimestamp is added if needed to construct the time.
+    :param signals: only decode these signals (names or regex patterns) per group, e.g. {"HFData": ["CURRENT.*"]}.
+    The columns needed to construct the time (e.g. CYCLE) are always decoded. CapturePayload.shapes holds the shapes
+    of all groups as if they were decoded completely.
+    :param cache: cache (or its directory) that stores the parsed recording on disk. A recording is only parsed if the
+    files or the parse options changed.
+    :param lazy: build the DataFrame of a group (and construct its time) only when it is accessed for the first time.
+    Until then, the group is kept as decoded column buffers (or in the cache entry on disk).
+    :param fingerprints: G-code hashes to compute while decoding in addition to the hash of all blocks
+    (CapturePayload.hash_g_code()): "tool" (per active tool), "path" (per call-stack path of HFCallEvent, which is
+    decoded as well). See CapturePayload.fingerprints.
+    :param trace_memory: trace the peak memory per stage of the parsing with tracemalloc: "read" (footers and JSON),
+    "header", "decode" (payload), "concat" (DataFrames) and "time" (time construction). The result is stored in
+    CapturePayload.memory_stages (not for recordings loaded from the cache). With workers, only the memory of the
+    main process is traced, i.e. "decode" is merging the decoded parts. Tracing slows down the parsing.
+    :return: CapturePayload
+    """
     if isinstance(files, (str, Path)):
         files = [files]
 
-    # read files
-    content = dict()
-    for fl in files:
-        content[fl.name] = read_capture_recording(fl)
-
-    # find start file: loop through footers
-    start_filename = None
-    for filename, (_, _, footer) in content.items():
-        logging.debug(f"CaptureDataParser.parse(): {filename}")
-        previous_filename = footer["FilePathChain"]["Previous"]
-        actual_filename = footer["FilePathChain"]["Actual"]
-        assert filename == actual_filename
-
-        if previous_filename is None:
-            start_filename = actual_filename
-            break
-        elif previous_filename not in content:
-            warnings.warn(f"File {previous_filename} not found. Recording broken. Using a later start.")
-            start_filename = actual_filename
-        else:
-            start_filename = previous_filename
-
-    if start_filename is None:
-        raise FileNotFoundError(f"No start file of recording found in {[el.name for el in files]}.")
-
-    # walk through contents
-    signals = dict()
+    if cache is not None:
+        if not isinstance(cache, ParseCache):
+            cache = ParseCache(cache)
+        options = {"rename_hfdata": rename_hfdata, "groups": groups, "signals": signals, "fingerprints": fingerprints}
+        return cache.get(
+            files,
+            options,
+            lambda: parse(
+                files,
+                rename_hfdata=rename_hfdata,
+                workers=workers,
+                groups=groups,
+                signals=signals,
+                fingerprints=fingerprints,
+                trace_memory=trace_memory
+            ),
+            lazy=lazy
+        )
+
+    trace = None
+    if trace_memory:
+        trace = MemoryTrace()
+        trace.start()
+    try:
+        payload = _parse(files, rename_hfdata, workers, groups, signals, lazy, fingerprints, trace)
+    finally:
+        if trace is not None:
+            trace.stop()
+    if trace is not None:
+        payload.memory_stages = trace.to_frame()
+    return payload
+
+
+def _parse(
+        files: List[Union[Path, str]],
+        rename_hfdata: bool,
+        workers: Union[int, None],
+        groups: Union[List[str], None],
+        signals: Union[Dict[str, List[str]], None],
+        lazy: bool,
+        fingerprints: Union[List[str], None],
+        trace: Union[MemoryTrace, None]
+) -> CapturePayload:
+    """parses a (chained) recording without cache (see parse())"""
+    stage = trace.stage if trace is not None else lambda name: nullcontext()
+
+    files = {Path(fl).name: Path(fl) for fl in files}
+
+    components = None
+    if groups is not None:
+        components = list(groups)
+        if any(el in components for el in ("HFData", "HFBlockEvent", "HFCallEvent")) and \
+                ("HFTimestamp" not in components):
+            components.append("HFTimestamp")
+        if (fingerprints is not None) and ("path" in fingerprints) and ("HFBlockEvent" in components) and \
+                ("HFCallEvent" not in components):
+            components.append("HFCallEvent")
+
+    # determine order of the files from their footers only
+    with stage("read"):
+        order = order_chain({filename: read_footer(fl) for filename, fl in files.items()})
+    paths = [files[el] for el in order]
+
+    segments: List[Dict[str, pd.DataFrame]] = []
     head0 = None
-    i = 1
-    next_filename = start_filename
-    while True:
-        header, payload, footer = content[next_filename]
-
-        # parse single file
-        head = parse_header(header)
-        raw = parse_payload(payload, head.signals, rename_hfdata=rename_hfdata)
-
-        # keep initial time information
-        if len(signals) == 0:
-            head0 = head
-
-        # concatenate signals
-        for ky, vl in raw.items():
-            if ky in signals:
-                signals[ky] += [vl, ]
-            else:
-                signals[ky] = [vl]
-
-        # update next filename
-        next_filename = footer["FilePathChain"]["Next"]
-        if next_filename is None:
-            break
-        elif next_filename not in content:
-            warnings.warn(f"File {next_filename} not found. Recording broken. Terminating recording earlier.")
-            break
-        i += 1
-
-    # concatenate all fields
-    for ky, vl in signals.items():
-        signals[ky] = pd.concat(vl, axis=0, ignore_index=True)
-
-    return CapturePayload(signals, head0.time)
+    decoder = None
+    # more processes than CPUs only add overhead
+    workers = min(workers or 1, len(paths), os.cpu_count() or 1)
+    if workers > 1:
+        # decode files in parallel and join the column arrays in the order of the chain
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(decode_part, paths, repeat(rename_hfdata), repeat(components), repeat(signals))
+            for i, (head, columns, counts, _) in enumerate(results):
+                logging.debug(f"CaptureDataParser.parse(): {paths[i].name}")
+                if (decoder is None) or (decoder.signals_header != head.signals):
+                    if decoder is not None:
+                        # signals changed within the recording: close current segment
+                        segments.append(decoder)
+                    decoder = PayloadDecoder(
+                        head.signals,
+                        rename_hfdata=rename_hfdata,
+                        components=components,
+                        signals=signals,
+                        fingerprints=decoder.fingerprints if decoder is not None else Fingerprints(fingerprints)
+                    )
+                with stage("decode"):
+                    decoder.merge(columns, counts)
+                    decoder.update_fingerprints()
+
+                if i == 0:
+                    head0 = head
+                    # preallocate buffers for the remaining parts
+                    decoder.reserve(len(paths))
+    else:
+        # walk through the chain: decode one file at a time into the same column buffers
+        for i, fl in enumerate(paths):
+            logging.debug(f"CaptureDataParser.parse(): {fl.name}")
+            head, decoder_, _ = decode_recording(
+                fl,
+                rename_hfdata=rename_hfdata,
+                components=components,
+                decoder=decoder,
+                signals=signals,
+                fingerprints=fingerprints,
+                trace=trace
+            )
+
+            if (decoder is not None) and (decoder_ is not decoder):
+                # signals changed within the recording: close current segment
+                segments.append(decoder)
+            decoder = decoder_
+
+            if i == 0:
+                head0 = head
+                # preallocate buffers for the remaining parts
+                decoder.reserve(len(paths))
+
+    segments.append(decoder)
+    shapes: Dict[str, Tuple[int, int]] = dict()
+    for seg in segments:
+        for ky, (n_rows, n_columns) in seg.shapes().items():
+            n_rows0, n_columns0 = shapes.get(ky, (0, 0))
+            shapes[ky] = (n_rows0 + n_rows, max(n_columns0, n_columns))
+
+    if lazy:
+        # keep the decoded buffers until a group is accessed
+        keys = list(dict.fromkeys(ky for seg in segments for ky in seg.data))
+        data = {ky: partial(join_segments, segments, ky) for ky in keys}
+    elif len(segments) > 1:
+        # concatenate all fields
+        with stage("concat"):
+            data = dict()
+            for seg in segments:
+                for ky, vl in seg.to_frames().items():
+                    data[ky] = data.get(ky, []) + [vl]
+            for ky, vl in data.items():
+                data[ky] = pd.concat(vl, axis=0, ignore_index=True)
+    else:
+        with stage("concat"):
+            data = segments[0].to_frames()
+
+    with stage("time"):
+        return CapturePayload(data, head0.time, shapes=shapes, fingerprints=decoder.fingerprints.to_dict())
+
+
+def join_segments(segments: List[PayloadDecoder], key: str) -> pd.DataFrame:
+    """
+    builds the DataFrame of a group from the segments of a recording and releases their decoded data of this group
+    :param segments: decoders of the segments (parts with the same signals) of a recording
+    :param key: group
+    :return: DataFrame
+    """
+    frames = [seg.to_frame(key, release=True) for seg in segments if key in seg.data]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, axis=0, ignore_index=True)
 
 
 if __name__ == "__main__":
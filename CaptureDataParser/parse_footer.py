@@ -0,0 +1,233 @@
+from pathlib import Path
+import json
+import re
+import logging
+import warnings
+
+from typing import Union, List, Dict, Tuple
+
+from CaptureDataParser.FooterData import FooterData, FilePathChain, RecordingChain
+from CaptureDataParser.stream import iter_capture_recording
+
+
+re_footer_key = re.compile(r'"Footer"\s*:\s*')
+
+
+def _decode_footer(tail: str) -> Union[dict, None]:
+    """decodes the footer from the tail of a file if it is the last entry of the top-level object"""
+    decoder = json.JSONDecoder()
+    for m in reversed(list(re_footer_key.finditer(tail))):
+        try:
+            footer, end = decoder.raw_decode(tail, m.end())
+        except json.JSONDecodeError:
+            continue
+        if isinstance(footer, dict) and (tail[end:].strip() == "}"):
+            return footer
+    return None
+
+
+def read_footer(
+        file: Union[Path, str],
+        tail_size: int = 2 ** 14,
+        max_tail_size: int = 2 ** 24
+) -> dict:
+    """
+    reads the footer of a recording. Only the tail of the file is read; the file is streamed as a whole only if the
+    footer was not found at its end.
+    :param file: path to the JSON file
+    :param tail_size: number of bytes that are read from the end of the file first
+    :param max_tail_size: maximum number of bytes read from the end before falling back to streaming the file
+    :return: footer
+    """
+    if isinstance(file, str):
+        file = Path(file)
+
+    if not file.is_file():
+        raise FileNotFoundError
+
+    size = file.stat().st_size
+    n = tail_size
+    with open(file, "rb") as fid:
+        while True:
+            n = min(n, size)
+            fid.seek(size - n)
+            # the first character may be cut
+            tail = fid.read(n).decode("utf-8", errors="ignore")
+            footer = _decode_footer(tail)
+            if footer is not None:
+                return footer
+            elif (n >= size) or (n >= max_tail_size):
+                break
+            n *= 4
+
+    # fallback: stream file without keeping the payload in memory
+    footer = None
+    for key, value in iter_capture_recording(file):
+        if key == "Footer":
+            footer = value
+
+    if footer is None:
+        raise Exception(f"No footer found in {file.name}.")
+    return footer
+
+
+def parse_footer(footer: dict) -> FooterData:
+    chain = footer["FilePathChain"]
+    return FooterData(
+        error_messages=footer.get("ErrorMessages") or [],
+        file_path_chain=FilePathChain(
+            previous=chain.get("Previous"),
+            actual=chain["Actual"],
+            next=chain.get("Next"),
+            index=chain.get("Index"),
+            stream_index=chain.get("StreamIndex"),
+        )
+    )
+
+
+def order_chain(footers: Dict[str, dict]) -> List[str]:
+    """
+    determines the order of the files of a chained recording from their footers ("FilePathChain")
+    :param footers: dictionary of file name and footer
+    :return: file names in the order of the recording
+    """
+    chain = {filename: footer["FilePathChain"] for filename, footer in footers.items()}
+
+    # find start file
+    start_filename = None
+    candidates = []
+    for filename, links in chain.items():
+        logging.debug(f"CaptureDataParser.order_chain(): {filename}")
+        assert filename == links["Actual"]
+
+        if links["Previous"] is None:
+            start_filename = filename
+            break
+        elif links["Previous"] not in chain:
+            candidates.append(filename)
+
+    if start_filename is None:
+        if len(candidates) == 0:
+            raise FileNotFoundError(f"No start file of recording found in {list(chain.keys())}.")
+        # earliest part whose predecessor is missing
+        start_filename = min(candidates, key=lambda x: chain[x]["Index"] if chain[x]["Index"] is not None else 0)
+        warnings.warn(f"File {chain[start_filename]['Previous']} not found. Recording broken. Using a later start.")
+
+    # walk through chain
+    order = [start_filename]
+    while True:
+        next_filename = chain[order[-1]]["Next"]
+        if next_filename is None:
+            break
+        elif (next_filename not in chain) or (next_filename in order):
+            warnings.warn(f"File {next_filename} not found. Recording broken. Terminating recording earlier.")
+            break
+        order.append(next_filename)
+    return order
+
+
+def link_chains(folder: Path, links: Dict[str, Tuple[Path, FilePathChain]]) -> List[RecordingChain]:
+    """
+    builds the chains of the files of a folder
+    :param folder: folder of the files
+    :param links: dictionary of file name and (path, file path chain)
+    :return: list of recordings
+    """
+    def sort_key(name: str):
+        index = links[name][1].index
+        return (index if index is not None else 0), name
+
+    def is_start(name: str) -> bool:
+        previous = links[name][1].previous
+        return (previous is None) or (previous not in links) or (links[previous][1].next != name)
+
+    # start with files that have no valid predecessor, cycles remain
+    starts = sorted([el for el in links if is_start(el)], key=sort_key)
+    starts += sorted([el for el in links if el not in starts], key=sort_key)
+
+    chains = []
+    visited = set()
+    for start in starts:
+        if start in visited:
+            continue
+
+        missing, inconsistent = [], []
+        if links[start][1].actual != start:
+            inconsistent.append(start)
+
+        previous = links[start][1].previous
+        if previous is not None:
+            if previous not in links:
+                missing.append(previous)
+            else:
+                inconsistent.append(previous)
+
+        # walk through chain
+        order = [start]
+        visited.add(start)
+        while True:
+            next_filename = links[order[-1]][1].next
+            if next_filename is None:
+                break
+            elif next_filename not in links:
+                missing.append(next_filename)
+                break
+            elif (next_filename in visited) or (links[next_filename][1].previous != order[-1]):
+                inconsistent.append(next_filename)
+                break
+            order.append(next_filename)
+            visited.add(next_filename)
+
+        chains.append(
+            RecordingChain(
+                folder=folder,
+                files=[links[el][0] for el in order],
+                missing=missing,
+                inconsistent=inconsistent
+            )
+        )
+    return chains
+
+
+def find_chains(directory: Union[Path, str], pattern: str = "**/*.json") -> List[RecordingChain]:
+    """
+    scans a directory for recordings by reading only the footers of the files. Files are linked per folder. Warns
+    about broken chains (missing or inconsistent links) and folders that contain several recordings.
+    :param directory: directory to scan
+    :param pattern: glob pattern of the recording files
+    :return: list of recordings (longest recording of a folder first)
+    """
+    directory = Path(directory)
+
+    # read footers and group them by folder
+    folders: Dict[Path, Dict[str, Tuple[Path, FilePathChain]]] = dict()
+    for fl in sorted(directory.glob(pattern)):
+        try:
+            footer = parse_footer(read_footer(fl))
+        except Exception as ex:
+            warnings.warn(f"Failed to read footer of {fl.as_posix()} with exception: {ex}")
+            continue
+
+        if fl.parent not in folders:
+            folders[fl.parent] = dict()
+        folders[fl.parent][fl.name] = (fl, footer.file_path_chain)
+
+    chains = []
+    for folder, links in folders.items():
+        chains_folder = sorted(link_chains(folder, links), key=lambda x: len(x.files), reverse=True)
+
+        # the parts of a broken recording reference the same missing file
+        missing = [el for chain in chains_folder for el in chain.missing]
+        n_recordings = len(chains_folder) - (len(missing) - len(set(missing)))
+        if n_recordings > 1:
+            warnings.warn(f"{n_recordings} recordings found in {folder.as_posix()}.")
+        for chain in chains_folder:
+            if chain.missing:
+                warnings.warn(f"Recording broken in {folder.as_posix()}. Files not found: {', '.join(chain.missing)}.")
+            if chain.inconsistent:
+                warnings.warn(
+                    f"Recording broken in {folder.as_posix()}. "
+                    f"Inconsistent links to: {', '.join(chain.inconsistent)}."
+                )
+        chains += chains_folder
+    return chains
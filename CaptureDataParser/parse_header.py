@@ -1,7 +1,7 @@
-from dateutil import parser as datetime_parser
 import json
+from pathlib import Path
 
-from typing import List, Dict, Literal
+from typing import List, Dict, Literal, Union
 import warnings
 
 from CaptureDataParser.HeaderData import (
@@ -13,7 +13,8 @@ from CaptureDataParser.HeaderData import (
     SignalHeaderHF,
     SignalHeaderLF
 )
-from CaptureDataParser.utils import cast_dtype
+from CaptureDataParser.utils import cast_dtype, parse_timestamp
+from CaptureDataParser.stream import iter_capture_recording
 
 
 def parse_signals(signals: List[Dict[str, str]], mode: Literal["hf", "lf"]) -> List[SignalHeaderHF] | List[SignalHeaderLF]:
@@ -71,7 +72,7 @@ def parse_header(header: dict) -> HeaderData:
 
     # time
     time = TimeInfo(
-            start_time=datetime_parser.parse(header["Initial"]["Time"]),
+            start_time=parse_timestamp(header["Initial"]["Time"]),
             hf_cycle_time=int(header["CycleTimeMs"]) if "CycleTimeMs" in header else -1,
             start_counter=int(header["Initial"]["HFProbeCounter"]) if "HFProbeCounter" in header["Initial"] else -1,
         )
@@ -95,3 +96,15 @@ def parse_header(header: dict) -> HeaderData:
         signals=signals
     )
 
+
+def read_header(file: Union[Path, str]) -> HeaderData:
+    """
+    reads and parses the header of a recording. The file is only read up to the header, i.e. the payload is not read
+    if the header precedes it.
+    :param file: path to the JSON file
+    :return: header
+    """
+    for key, value in iter_capture_recording(file, skip=lambda x: True):
+        if key == "Header":
+            return parse_header(value)
+    raise Exception(f"No header found in {Path(file).name}.")
@@ -1,133 +1,613 @@
 import numpy as np
 import pandas as pd
-from datetime import datetime
-from dateutil import parser as datetime_parser
-from dateutil.tz import tz
 
 from typing import List, Dict, Tuple, Union, Any
 
 from CaptureDataParser.HeaderData import SignalHeaderHF, SignalHeaderLF, TimeInfo
-from CaptureDataParser.utils import cast_dtype, rename_signal, interplin
+from CaptureDataParser.utils import (
+    cast_dtype,
+    numpy_dtype,
+    rename_signal,
+    parse_timestamps,
+    match_key_patterns
+)
+from CaptureDataParser.stream import SkippedArray
+from CaptureDataParser.ClockModel import ClockModel
+from CaptureDataParser.Fingerprints import Fingerprints
 
 
-def parse_payload(
-        payload: List[Dict[str, List[List[Union[int, float]]]]],
-        signals_header: Dict[str, List[SignalHeaderHF | SignalHeaderLF]],
-        rename_hfdata: bool = False,
-        components: List[str] = None
-) -> Dict[str, pd.DataFrame]:
-    data: Dict[str, List[Dict[str, Any]]] = dict()
-    for msg in payload:
+# columns that are always decoded (needed to construct the time and to limit the rows)
+index_columns = {
+    "HFData": ["CYCLE"],
+    "HFCallEvent": ["HFProbeCounter", "Time"],
+    "HFBlockEvent": ["HFProbeCounter", "Time"],
+    "HFTimestamp": ["HFProbeCounter", "Time"],
+}
+
+
+class HFDataDecoder:
+    """
+    Column-wise decoder for HFData-like messages (lists of rows that follow the order of the signal header).
+    Column names, column indices, and data types are compiled once from the header. The raw rows of all messages are
+    collected and cast to one numpy array per column without any per-cell python work. Optionally, only a subset of
+    the columns is decoded.
+    """
+    def __init__(
+            self,
+            signals: List[SignalHeaderHF],
+            rename: bool = False,
+            keys: List[str] = None,
+            chunk_size: int = 2 ** 12
+    ) -> None:
+        # map column name to index in a raw row (a duplicate name keeps the position of its first occurrence but the
+        # value of its last occurrence, same as building a dictionary per row)
+        columns: Dict[str, int] = dict()
+        dtypes: Dict[str, np.dtype] = dict()
+        for i, hd in enumerate(signals):
+            name = rename_signal(hd) if rename else hd.name
+            columns[name] = i
+            dtypes[name] = numpy_dtype(hd.dtype)
+        # number of columns of the full table
+        self.n_columns = len(columns)
+
+        if keys is not None:
+            # decode selected columns only
+            selected = match_key_patterns(list(columns.keys()), keys)
+            columns = {ky: columns[ky] for ky in selected}
+            dtypes = {ky: dtypes[ky] for ky in selected}
+
+        self.columns: List[str] = list(columns.keys())
+        self.indices: List[int] = list(columns.values())
+        self.dtypes: List[np.dtype] = list(dtypes.values())
+        self.n_signals = len(signals)
+        self.n_rows = 0
+
+        # rows are buffered and cast chunk-wise to keep the raw python objects short-lived
+        self.chunk_size = chunk_size
+        self._rows: List[List[Union[int, float]]] = []
+        # preallocated column buffers (capacity may exceed the number of rows)
+        self._size = 0
+        self._buffers: List[np.ndarray] = [np.empty(0, dtype=dtype) for dtype in self.dtypes]
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def index_only(self) -> bool:
+        """only the first column is decoded and it holds integers, i.e. the rows need not be decoded at all"""
+        return (self.indices == [0]) and (self.dtypes[0].kind in "iu")
+
+    def append(self, rows: List[List[Union[int, float]]]) -> None:
+        self._rows.extend(rows)
+        self.n_rows += len(rows)
+        if len(self._rows) >= self.chunk_size:
+            self._flush()
+
+    def append_index(self, values: List[str]) -> None:
+        """
+        appends the first column of rows that were skipped without decoding them (see index_only)
+        :param values: integers of the first column as strings
+        """
+        self._flush()
+        self._write([np.array(values, dtype=self.dtypes[0])])
+        self.n_rows += len(values)
+
+    def reserve(self, n_rows: int) -> None:
+        """
+        preallocates the column buffers for a total number of rows
+        :param n_rows: expected total number of rows
+        """
+        capacity = len(self._buffers[0]) if self._buffers else 0
+        if n_rows <= capacity:
+            return
+        for i, buf in enumerate(self._buffers):
+            new = np.empty(n_rows, dtype=buf.dtype)
+            new[:self._size] = buf[:self._size]
+            self._buffers[i] = new
+
+    def _flush(self) -> None:
+        rows = self._rows
+        if len(rows) == 0:
+            return
+
+        n = self.n_signals
+        # columns before the shortest row are complete
+        complete = min(len(el) for el in rows)
+        if complete < n:
+            # missing values become None (as missing keys of a row-dictionary do)
+            rows = [(el + [None] * (n - len(el)))[:n] for el in rows]
+
+        # transpose rows to columns
+        if 2 * len(self.indices) > n:
+            values = list(zip(*rows))
+        else:
+            # only a few columns are selected
+            values = {i: [el[i] for el in rows] for i in self.indices}
+        columns = []
+        for i, dtype in zip(self.indices, self.dtypes):
+            if i < complete:
+                if dtype == object:
+                    columns.append(np.array([str(el) for el in values[i]], dtype=object))
+                else:
+                    columns.append(np.array(values[i], dtype=dtype))
+            elif dtype == object:
+                columns.append(np.array([np.nan if el is None else str(el) for el in values[i]], dtype=object))
+            elif dtype.kind in "iu":
+                # integers with missing values are upcast to float (None becomes NaN)
+                columns.append(np.array(values[i], dtype=np.float64))
+            else:
+                columns.append(np.array(values[i], dtype=dtype))
+
+        self._rows = []
+        self._write(columns)
+
+    def _write(self, columns: List[np.ndarray]) -> None:
+        """writes already cast columns to the buffers"""
+        k = len(columns[0]) if columns else 0
+
+        # grow buffers (at least doubling the capacity)
+        capacity = len(self._buffers[0]) if self._buffers else 0
+        if self._size + k > capacity:
+            self.reserve(max(self._size + k, 2 * capacity))
+
+        for j, column in enumerate(columns):
+            buf = self._buffers[j]
+            dtype = np.result_type(buf.dtype, column.dtype)
+            if dtype != buf.dtype:
+                # upcast buffer (e.g. integers with missing values)
+                buf = buf.astype(dtype)
+                self._buffers[j] = buf
+            buf[self._size:self._size + k] = column
+        self._size += k
+
+    def extend(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        appends columns that were decoded elsewhere (e.g. by another process)
+        :param arrays: dictionary of column name and numpy array as returned by to_arrays()
+        """
+        self._flush()
+        columns = [arrays[name] for name in self.columns]
+        self._write(columns)
+        self.n_rows += len(columns[0]) if columns else 0
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        casts all collected rows
+        :return: dictionary of column name and numpy array
+        """
+        self._flush()
+        arrays = dict()
+        for j, name in enumerate(self.columns):
+            buf = self._buffers[j]
+            if len(buf) > 1.1 * self._size:
+                # release unused capacity
+                buf = buf[:self._size].copy()
+                self._buffers[j] = buf
+            arrays[name] = buf[:self._size]
+        return arrays
+
+    def to_frame(self) -> pd.DataFrame:
+        if self.n_rows == 0:
+            return pd.DataFrame()
+        return pd.DataFrame(self.to_arrays(), copy=False)
+
+
+def to_object_array(values: list) -> np.ndarray:
+    """converts a list to a 1-dimensional object array (even if the elements are lists themselves)"""
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def cast_values(values: np.ndarray, dtype: type) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    casts an object array in one step to a data type as returned by cast_dtype(). Falls back to element-wise casting
+    if the array contains values that cannot be cast.
+    :param values: object array of raw values
+    :param dtype: data type (int, np.float32, np.double, str)
+    :return: boolean mask of the values that could be cast, cast values
+    """
+    if dtype is str:
+        if pd.api.types.infer_dtype(values, skipna=False) != "string":
+            values = to_object_array([str(el) for el in values])
+        return np.ones(len(values), dtype=bool), values
+
+    try:
+        return np.ones(len(values), dtype=bool), values.astype(numpy_dtype(dtype))
+    except (ValueError, TypeError, OverflowError):
+        pass
+
+    # drop malformed values
+    lg = np.zeros(len(values), dtype=bool)
+    cast = []
+    for i, el in enumerate(values):
+        try:
+            cast.append(dtype(el))
+            lg[i] = True
+        except (ValueError, TypeError, OverflowError):
+            pass
+    return lg, np.array(cast, dtype=numpy_dtype(dtype))
+
+
+class LFDataDecoder:
+    """
+    Decoder for LFData messages (one datapoint per row: address, value, value_type, timestamp). The raw fields are
+    collected per message; values are cast per address and data type in one vectorized step. Malformed rows are
+    dropped. Optionally, only a subset of the addresses is kept.
+    """
+    fields = ("address", "value", "value_type", "timestamp")
+
+    def __init__(self, signals: List[SignalHeaderLF], keys: List[str] = None) -> None:
+        # address -> header
+        self.headers: Dict[str, SignalHeaderLF] = {hd.address: hd for hd in signals}
+        self.keys = keys
+        # address -> selected
+        self._selected: Dict[str, bool] = dict()
+        self._raw: Dict[str, list] = {ky: [] for ky in self.fields + ("HFProbeCounter", )}
+
+    def __len__(self) -> int:
+        return len(self._raw["address"])
+
+    def append(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            columns = {ky: [el[ky] for el in rows] for ky in self.fields}
+        except (KeyError, TypeError):
+            # drop incomplete rows
+            rows = [el for el in rows if isinstance(el, dict) and all(ky in el for ky in self.fields)]
+            columns = {ky: [el[ky] for el in rows] for ky in self.fields}
+        columns["HFProbeCounter"] = [el.get("HFProbeCounter") for el in rows]
+
+        if self.keys is not None:
+            # drop addresses that were not selected
+            for address in set(columns["address"]).difference(self._selected):
+                self._selected[address] = len(match_key_patterns([str(address)], self.keys)) > 0
+            lg = [self._selected[el] for el in columns["address"]]
+            if not all(lg):
+                columns = {ky: [el for el, sel in zip(val, lg) if sel] for ky, val in columns.items()}
+
+        for ky, val in columns.items():
+            self._raw[ky] += val
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        exports the raw fields
+        :return: dictionary of field name and object array
+        """
+        return {ky: to_object_array(val) for ky, val in self._raw.items()}
+
+    def extend(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        appends raw fields that were collected elsewhere (e.g. by another process)
+        :param arrays: dictionary of field name and object array as returned by to_arrays()
+        """
+        for ky, val in arrays.items():
+            self._raw[ky] += list(val)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        builds a table in long format: one row per datapoint with the columns Address (categorical), Value, Time, and
+        HFProbeCounter (if available). Use pivot_lfdata() to obtain one column per address.
+        :return: DataFrame
+        """
+        n = len(self)
+        if n == 0:
+            return pd.DataFrame()
+        raw = self.to_arrays()
+
+        # cast values per address and data type
+        valid = np.zeros(n, dtype=bool)
+        values = np.full(n, np.nan, dtype=object)
+        groups = pd.Series(np.arange(n)).groupby([raw["address"], raw["value_type"]], sort=False).indices
+        for (_, value_type), idx in groups.items():
+            try:
+                dtype = cast_dtype(value_type)
+            except Exception:
+                # unknown data type
+                continue
+            lg, cast = cast_values(raw["value"][idx], dtype)
+            valid[idx[lg]] = True
+            values[idx[lg]] = cast
+
+        # parse timestamps at once, drop rows with invalid timestamps
+        time = parse_timestamps(raw["timestamp"])
+        valid &= time.notna().to_numpy() | pd.isna(raw["timestamp"])
+
+        data = {
+            "Address": pd.Categorical(raw["address"][valid], categories=pd.unique(raw["address"][valid])),
+            "Value": pd.Series(values[valid], dtype=object).infer_objects(),
+            "Time": time[valid].reset_index(drop=True),
+        }
+        counter = raw["HFProbeCounter"][valid]
+        lg = pd.notna(counter)
+        if lg.any():
+            data["HFProbeCounter"] = np.array(counter.tolist() if lg.all() else np.where(lg, counter, np.nan).tolist())
+        return pd.DataFrame(data)
+
+
+def is_long_format(df: pd.DataFrame) -> bool:
+    """checks whether a table is in the long format of LFData"""
+    return ("Address" in df) and ("Value" in df)
+
+
+def pivot_lfdata(
+        df: pd.DataFrame,
+        addresses: List[str] = None,
+        ffill: bool = False
+) -> pd.DataFrame:
+    """
+    builds the wide table of LFData (one row per datapoint, one column per address) from the long format. Only the
+    requested addresses are turned into columns.
+    :param df: LFData in long format
+    :param addresses: addresses to build columns for (all addresses if None)
+    :param ffill: forward fill the values of each address
+    :return: DataFrame with the address columns, Time and HFProbeCounter
+    """
+    codes, uniques = pd.factorize(df["Address"])
+    uniques = list(uniques)
+    if addresses is None:
+        addresses = uniques
+    n = len(df)
+    values = df["Value"].to_numpy()
+
+    # columns in order of their first appearance (address, time, counter per row)
+    first: Dict[str, Tuple[int, int]] = dict()
+    columns: Dict[str, Union[np.ndarray, pd.Series]] = dict()
+    for address in addresses:
+        if address not in uniques:
+            continue
+        idx = np.flatnonzero(codes == uniques.index(address))
+        first[address] = (int(idx[0]), 0)
+
+        # restore data type of this address
+        val = pd.Series(values[idx], dtype=values.dtype).infer_objects().to_numpy()
+        if len(idx) == n:
+            column = val
+        else:
+            column = np.full(n, np.nan, dtype=np.float64 if val.dtype.kind in "iuf" else object)
+            column[idx] = val
+            if ffill:
+                column = pd.Series(column).ffill().to_numpy()
+        columns[address] = column
+
+    first["Time"] = (0, 1)
+    columns["Time"] = df["Time"]
+    if "HFProbeCounter" in df:
+        first["HFProbeCounter"] = (int(np.argmax(df["HFProbeCounter"].notna().to_numpy())), 2)
+        columns["HFProbeCounter"] = df["HFProbeCounter"]
+
+    return pd.DataFrame({ky: columns[ky] for ky in sorted(first, key=lambda x: first[x])}, index=df.index)
+
+
+class PayloadDecoder:
+    """
+    Incremental decoder of the messages of a payload. Messages can be fed one at a time, e.g. while a recording is
+    streamed from disk, so that only the decoded data is kept in memory. The rows of all message types are counted,
+    even if they are not decoded.
+    """
+    def __init__(
+            self,
+            signals_header: Dict[str, List[SignalHeaderHF | SignalHeaderLF]],
+            rename_hfdata: bool = False,
+            components: List[str] = None,
+            signals: Dict[str, List[str]] = None,
+            fingerprints: Fingerprints = None
+    ) -> None:
+        """
+        :param signals_header: signals of the header
+        :param rename_hfdata: rename the enumerated axes of HFData signals by their axis names
+        :param components: only decode these message types (decode all if None)
+        :param signals: only decode these signals (names or regex patterns) of a message type (decode all if a
+        message type is not listed). The columns needed to construct the time are always decoded.
+        :param fingerprints: G-code hashes to continue (e.g. of the previous segment of a recording)
+        """
+        self.signals_header = signals_header
+        self.rename_hfdata = rename_hfdata
+        self.components = components
+        self.signals = signals if signals is not None else dict()
+        self.data: Dict[str, Union[List[Dict[str, Any]], HFDataDecoder, LFDataDecoder]] = dict()
+        # number of rows per message type
+        self.counts: Dict[str, int] = dict()
+        self.fingerprints = fingerprints if fingerprints is not None else Fingerprints()
+        # number of events that were added to the fingerprints
+        self._n_fingerprinted = {"HFBlockEvent": 0, "HFCallEvent": 0}
+
+    def _keys(self, key: str) -> Union[List[str], None]:
+        """selected signals of a message type (None if all signals are decoded)"""
+        if key not in self.signals:
+            return None
+        return index_columns.get(key, []) + list(self.signals[key])
+
+    def _create_decoder(self, key: str) -> Union[HFDataDecoder, LFDataDecoder]:
+        if key == "LFData":
+            return LFDataDecoder(self.signals_header[key], keys=self._keys(key))
+        else:
+            return HFDataDecoder(
+                self.signals_header[key],
+                rename=self.rename_hfdata and (key == "HFData"),
+                keys=self._keys(key)
+            )
+
+    def skip(self, key: str) -> bool:
+        """
+        checks whether the rows of a message type need not be decoded because the message type was not selected or
+        only its (integer) index column is decoded
+        :param key: message type
+        :return: True if the rows can be skipped (see feed())
+        """
+        if (self.components is not None) and (key not in self.components):
+            return True
+        elif (key in self.signals_header) and (key != "LFData"):
+            if key not in self.data:
+                self.data[key] = self._create_decoder(key)
+            return self.data[key].index_only
+        return False
+
+    def feed(self, msg: Dict[str, Union[Any, SkippedArray]]) -> None:
         for ky, val in msg.items():
-            datapoints: List[Dict[str, Any]] = []
+            if isinstance(val, SkippedArray):
+                # rows that were skipped while reading (see skip())
+                self.counts[ky] = self.counts.get(ky, 0) + val.n_rows
+                if ky in self.data:
+                    self.data[ky].append_index(val.first)
+                continue
+            self.counts[ky] = self.counts.get(ky, 0) + (len(val) if isinstance(val, list) else 1)
 
-            if (components is not None) and (ky not in components):
+            if (self.components is not None) and (ky not in self.components):
                 # shortcut
                 continue
 
-            if ky in signals_header:
-                head = signals_header[ky]
-
-                # loop through all entrys in this message
-                for row in val:
-                    # assert len(row) == len(head)
-
-                    if ky == "LFData":
-                        assert all(el in row for el in ["address", "value", "value_type", "timestamp"])
-                        # get correct header
-                        for hd in head:
-                            if hd.address == row["address"]:
-                                break
-                        try:
-                            # casting may fail if json-message is brocken
-                            value = cast_dtype(row["value_type"])(row["value"])
-
-                            # standard message contents
-                            time = row["timestamp"]
-                            datapoint = {
-                                hd.address: value,
-                                "Time": datetime_parser.parse(time) if isinstance(time, str) else time,
-                            }
-                        except:
-                            datapoint = None
-
-                        # add hf probe counter if available
-                        if (datapoint is not None) and ("HFProbeCounter" in row):
-                            datapoint["HFProbeCounter"] = row["HFProbeCounter"]
-                    elif ky == "HFData" and rename_hfdata:
-                        datapoint = {rename_signal(hd): hd.dtype(el) for el, hd in zip(row, head)}
-                    else:  # "HFData"
-                        datapoint = {hd.name: hd.dtype(el) for el, hd in zip(row, head)}
-
-                    if datapoint is not None:
-                        datapoints.append(datapoint)
+            if ky in self.signals_header:
+                # HFData: decode column-wise, LFData: cast per address
+                if ky not in self.data:
+                    self.data[ky] = self._create_decoder(ky)
+                self.data[ky].append(val)
             elif ky in ["HFCallEvent", "HFBlockEvent", "HFTimestamp"]:
-                # parse timestamp if exists
-                if ("Time" in val) and isinstance(val["Time"], str):
-                    val["Time"] = datetime_parser.parse(val["Time"])
-                datapoints.append(val)
+                # timestamps are converted column-wise later
+                if ky not in self.data:
+                    self.data[ky] = []
+                self.data[ky].append(val)
             else:
                 raise Exception(f"Unrecognized data key {ky} in payload.")
 
-            # append signal
-            if ky not in data:
-                data[ky] = []
-            data[ky] += datapoints
+    def update_fingerprints(self) -> None:
+        """adds the events that were decoded since the last call to the fingerprints (e.g. after each file)"""
+        events = dict()
+        for ky, n in self._n_fingerprinted.items():
+            events[ky] = self.data.get(ky, [])[n:]
+            self._n_fingerprinted[ky] = n + len(events[ky])
+        if events["HFBlockEvent"] or events["HFCallEvent"]:
+            self.fingerprints.update(events["HFBlockEvent"], events["HFCallEvent"])
 
-    # make DataFrame
-    for ky, val in data.items():
-        data[ky] = pd.DataFrame(val)
-    return data
+    def reserve(self, factor: float) -> None:
+        """
+        preallocates the column buffers of all column-wise decoded groups for a multiple of the rows decoded so far,
+        e.g. for the remaining parts of a chained recording.
+        :param factor: expected total number of rows relative to the current number of rows
+        """
+        for val in self.data.values():
+            if isinstance(val, HFDataDecoder):
+                val.reserve(int(len(val) * factor))
 
+    def to_columns(self) -> Dict[str, Union[Dict[str, np.ndarray], List[Dict[str, Any]]]]:
+        """
+        exports the decoded data without building DataFrames: numpy arrays per column for column-wise decoded groups,
+        lists of datapoints otherwise. Cheap to send to another process.
+        """
+        return {
+            ky: val.to_arrays() if isinstance(val, (HFDataDecoder, LFDataDecoder)) else val
+            for ky, val in self.data.items()
+        }
+
+    def merge(
+            self,
+            columns: Dict[str, Union[Dict[str, np.ndarray], List[Dict[str, Any]]]],
+            counts: Dict[str, int] = None
+    ) -> None:
+        """
+        appends the data of another decoder with the same header (e.g. the next part of a chained recording)
+        :param columns: data as returned by to_columns()
+        :param counts: number of rows per message type of the other decoder
+        """
+        for ky, val in (counts or dict()).items():
+            self.counts[ky] = self.counts.get(ky, 0) + val
+        for ky, val in columns.items():
+            if isinstance(val, dict):
+                if ky not in self.data:
+                    self.data[ky] = self._create_decoder(ky)
+                self.data[ky].extend(val)
+            else:
+                if ky not in self.data:
+                    self.data[ky] = []
+                self.data[ky] += val
 
-def to_unix_time(t: datetime):
-    return int(t.timestamp() * 1e9)
+    def to_frame(self, key: str, release: bool = False) -> pd.DataFrame:
+        """
+        builds the DataFrame of a single message type
+        :param key: message type
+        :param release: drop the decoded data of this message type afterwards (the decoder cannot be used anymore)
+        :return: DataFrame
+        """
+        val = self.data[key]
+        if isinstance(val, (HFDataDecoder, LFDataDecoder)):
+            df = val.to_frame()
+        else:
+            df = pd.DataFrame(val)
+            keys = self._keys(key)
+            if keys is not None:
+                df = df[match_key_patterns(list(df.columns), keys)]
+            # parse timestamps at once
+            if "Time" in df:
+                df["Time"] = parse_timestamps(df["Time"])
+        if release:
+            del self.data[key]
+        return df
 
+    def to_frames(self) -> Dict[str, pd.DataFrame]:
+        # make DataFrame
+        return {ky: self.to_frame(ky) for ky in self.data}
 
-def construct_time(data: Dict[str, pd.DataFrame], initial_time: TimeInfo = None):
+    def shapes(self) -> Dict[str, Tuple[int, int]]:
+        """
+        shapes of the tables of all message types as if all signals were decoded. The number of rows is counted for
+        every message type (datapoints for LFData). The number of columns of HFData is known from the header, the
+        number of columns of other message types is only known if they were decoded (0 otherwise).
+        :return: dictionary of message type and (number of rows, number of columns)
+        """
+        shapes = dict()
+        for ky, n_rows in self.counts.items():
+            val = self.data.get(ky)
+            if isinstance(val, LFDataDecoder):
+                # long format: Address, Value, Time, HFProbeCounter
+                n_columns = 4
+            elif isinstance(val, HFDataDecoder):
+                n_columns = val.n_columns
+            elif (ky in self.signals_header) and (ky != "LFData"):
+                # not decoded: compile the columns from the header
+                decoder = HFDataDecoder(self.signals_header[ky], rename=self.rename_hfdata and (ky == "HFData"))
+                n_columns = decoder.n_columns
+            elif isinstance(val, list):
+                n_columns = len(set(el for row in val for el in row))
+            else:
+                n_columns = 0
+            shapes[ky] = (n_rows, n_columns)
+        return shapes
+
+
+def parse_payload(
+        payload: List[Dict[str, List[List[Union[int, float]]]]],
+        signals_header: Dict[str, List[SignalHeaderHF | SignalHeaderLF]],
+        rename_hfdata: bool = False,
+        components: List[str] = None
+) -> Dict[str, pd.DataFrame]:
+    decoder = PayloadDecoder(signals_header, rename_hfdata=rename_hfdata, components=components)
+    for msg in payload:
+        decoder.feed(msg)
+    return decoder.to_frames()
+
+
+# groups whose time is constructed from a counter column
+time_mapping = {
+    "HFCallEvent": "HFProbeCounter",
+    "HFBlockEvent": "HFProbeCounter",
+    "HFData": "CYCLE",
+}
+
+
+def construct_time(data: Dict[str, pd.DataFrame], initial_time: TimeInfo = None, clock: ClockModel = None):
     """
     sync time for HFData: CYCLE, HFCallEvent: HFProbeCounter, HFBlockEvent: HFProbeCounter, HFTimestamp: HFProbeCounter
 
     :param data:
     :param initial_time:
+    :param clock: clock model of the recording (fitted from HFTimestamp if None)
     :return:
     """
     if "HFTimestamp" in data:
-        mapping = {
-            "HFCallEvent": "HFProbeCounter",
-            "HFBlockEvent": "HFProbeCounter",
-            "HFData": "CYCLE",
-        }
-
-        xp = data["HFTimestamp"]["HFProbeCounter"]
-        yp = data["HFTimestamp"]["Time"].apply(lambda x: to_unix_time(x))
-        # keep info on time zone localization
-        tzinfo = data["HFTimestamp"]["Time"][0].tzinfo
+        if clock is None:
+            clock = ClockModel.from_timestamps(data["HFTimestamp"], initial_time)
 
-        # TODO: add plausibility check with initial_time.hf_cycle_time
-
-        if initial_time is not None:
-            xp0 = initial_time.start_counter
-            yp0 = initial_time.start_time
-
-            xp = xp.to_list()
-            yp = yp.to_list()
-
-            if xp0 != xp[0]:
-                xp = [xp0] + xp
-                yp = [to_unix_time(yp0)] + yp
-
-        for ky, val in mapping.items():
+        for ky, val in time_mapping.items():
             if ky in data:
-                x = data[ky][val]
-                # (linear) interpolation
-                y = interplin(x, xp, yp)
-
-                # convert to datetime object
-                time = pd.to_datetime(pd.Series(y, name="Time"), utc=tzinfo == tz.tzutc())
-                if tzinfo != tz.tzutc():
-                    # localize to non-UTC time zone
-                    time.apply(lambda x: x.tz_localize(tzinfo))
-
-                data[ky]["Time"] = time
+                # (linear) interpolation between the timestamps (every group starts with the recording)
+                data[ky]["Time"] = clock.to_datetime(data[ky][val], method="interpolate", epoch=0)
     return data
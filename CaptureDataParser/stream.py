@@ -0,0 +1,187 @@
+from pathlib import Path
+import json
+import re
+
+from typing import Union, Tuple, List, Any, Generator, Callable, NamedTuple
+
+
+re_array_start = re.compile(r"\[\s*\[")
+re_array_end = re.compile(r"\]\s*\]")
+re_row_head = re.compile(r"\[\s*(-?\d+)\s*[,\]]")
+
+
+class SkippedArray(NamedTuple):
+    """placeholder of a list of numeric rows that was skipped without decoding it"""
+    n_rows: int
+    # integer values of the first column (as strings)
+    first: List[str]
+
+
+class JSONStream:
+    """
+    Minimal incremental JSON reader. The file is read in chunks and single values are decoded from the buffer as soon
+    as they are complete.
+    """
+    def __init__(self, fid, chunk_size: int = 2 ** 20) -> None:
+        self.fid = fid
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read(self, n: int = None) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fid.read(max(n or 0, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        # drop consumed part of the buffer
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """returns the next non-whitespace character without consuming it"""
+        while True:
+            while (self.pos < len(self.buffer)) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read():
+                raise json.JSONDecodeError("Unexpected end of file", self.buffer, self.pos)
+
+    def expect(self, characters: str) -> str:
+        """consumes the next non-whitespace character which has to be one of the given characters"""
+        char = self.peek()
+        if char not in characters:
+            raise json.JSONDecodeError(f"Expected one of {characters!r} but found {char!r}", self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        """decodes the next value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a value that ends with the buffer may be incomplete (e.g. a number)
+                if (end < len(self.buffer)) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # grow buffer (at least doubling it to avoid decoding a large value too often)
+            self._read(len(self.buffer) - self.pos)
+
+    def skip_array(self) -> Union[SkippedArray, None]:
+        """
+        skips the next value without decoding it if it is a list of lists of numbers whose first column holds
+        integers (e.g. the rows of HFData). Only the number of rows and the first column are extracted.
+        :return: skipped array or None if the value is of another kind (nothing is consumed then)
+        """
+        if self.peek() != "[":
+            return None
+        if (re_array_start.match(self.buffer, self.pos) is None) and (len(self.buffer) - self.pos < 64):
+            self._read()
+        if re_array_start.match(self.buffer, self.pos) is None:
+            return None
+
+        while True:
+            m = re_array_end.search(self.buffer, self.pos)
+            if m is not None:
+                break
+            elif (
+                    (self.buffer.find('"', self.pos) >= 0) or
+                    (self.buffer.find("{", self.pos) >= 0) or
+                    not self._read(len(self.buffer) - self.pos)
+            ):
+                # no numeric array or end of file
+                return None
+        start, end = self.pos, m.end()
+
+        # only numbers and exactly two levels of brackets
+        if (self.buffer.find('"', start, end) >= 0) or (self.buffer.find("{", start, end) >= 0):
+            return None
+        n_brackets = self.buffer.count("[", start, end)
+        if n_brackets != self.buffer.count("]", start, end):
+            return None
+        first = re_row_head.findall(self.buffer, start + 1, end)
+        if len(first) != n_brackets - 1:
+            return None
+
+        self.pos = end
+        return SkippedArray(len(first), first)
+
+    def decode_object(self, skip: Callable[[str], bool]) -> dict:
+        """
+        decodes the next value which has to be an object. Numeric arrays of the keys for which skip(key) is True are
+        replaced by a SkippedArray.
+        :param skip: function that decides by the key whether a value can be skipped
+        :return: dictionary
+        """
+        self.expect("{")
+        obj = dict()
+        if self.peek() == "}":
+            self.pos += 1
+            return obj
+
+        while True:
+            key = self.decode()
+            self.expect(":")
+            value = self.skip_array() if skip(key) else None
+            obj[key] = self.decode() if value is None else value
+            if self.expect(",}") == "}":
+                return obj
+
+
+def iter_capture_recording(
+        file: Union[Path, str],
+        stream_key: str = "Payload",
+        chunk_size: int = 2 ** 20,
+        skip: Callable[[str], bool] = None
+) -> Generator[Tuple[str, Any], None, None]:
+    """
+    reads a recording incrementally. The top-level entries (e.g. "Header", "Footer") are yielded as a whole whereas
+    the elements of the "Payload" list are yielded one at a time. Hence, the file is never held in memory as a whole.
+    :param file: path to the JSON file
+    :param stream_key: top-level key of a list whose elements are yielded individually
+    :param chunk_size: number of characters that are read at once
+    :param skip: function that decides by the key of a message whether its numeric rows can be skipped without
+    decoding them (they are yielded as SkippedArray)
+    :return: generator of (key, value) tuples in the order of the file
+    """
+    if isinstance(file, str):
+        file = Path(file)
+
+    if not file.is_file():
+        raise FileNotFoundError
+
+    with open(file, "r", encoding="utf-8") as fid:
+        stream = JSONStream(fid, chunk_size=chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+
+        while True:
+            key = stream.decode()
+            stream.expect(":")
+            if (key == stream_key) and (stream.peek() == "["):
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.expect("]")
+                else:
+                    while True:
+                        if (skip is not None) and (stream.peek() == "{"):
+                            yield key, stream.decode_object(skip)
+                        else:
+                            yield key, stream.decode()
+                        if stream.expect(",]") == "]":
+                            break
+            else:
+                yield key, stream.decode()
+
+            if stream.expect(",}") == "}":
+                break
@@ -1,12 +1,17 @@
 import re
 import hashlib
+import tracemalloc
+from contextlib import contextmanager
+from timeit import default_timer
+import warnings
 import numpy as np
 import pandas as pd
-import re
+from datetime import datetime, timedelta, tzinfo
+from dateutil import parser as datetime_parser
 
 from CaptureDataParser.HeaderData import SignalHeaderHF
 
-from typing import List, Union
+from typing import List, Dict, Union
 
 
 def cast_dtype(dtype: str) -> type:
@@ -29,6 +34,84 @@ def cast_dtype(dtype: str) -> type:
         raise Exception(f"Unrecognized data type {dtype}.")
 
 
+def numpy_dtype(dtype: type) -> np.dtype:
+    """
+    translates a data type as returned by cast_dtype() to the numpy data type of a column
+    :param dtype: data type (int, np.float32, np.double, str)
+    :return: numpy data type
+    """
+    if dtype is int:
+        return np.dtype(np.int64)
+    elif dtype is str:
+        return np.dtype(object)
+    else:
+        return np.dtype(dtype)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    parses a single timestamp string. ISO 8601 (incl. 'Z' and offsets) is parsed natively, dateutil is the fallback.
+    :param value: timestamp string
+    :return: datetime object
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime_parser.parse(value)
+
+
+def parse_timestamps(values: Union[pd.Series, np.ndarray, list]) -> pd.Series:
+    """
+    converts a column of timestamps in one vectorized step. ISO 8601 strings are parsed by pandas, 'Z' and offsets
+    are kept as time zone aware timestamps (converted to UTC if the offsets differ). Only strings that do not match
+    ISO 8601 are parsed by dateutil.
+    :param values: timestamp strings (or datetime objects)
+    :return: series of datetime values
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    if pd.api.types.infer_dtype(series, skipna=True) == "string":
+        try:
+            with warnings.catch_warnings():
+                # pandas < 3.0 warns about mixed offsets and returns objects instead of raising
+                warnings.simplefilter("ignore", FutureWarning)
+                time = pd.to_datetime(series, format="ISO8601")
+            if pd.api.types.is_datetime64_any_dtype(time):
+                return time
+        except (ValueError, TypeError):
+            # mixed offsets or strings that are no ISO 8601
+            pass
+
+    def parse_fallback(x):
+        try:
+            return datetime_parser.parse(x) if isinstance(x, str) else x
+        except (ValueError, OverflowError):
+            return pd.NaT
+
+    time = pd.to_datetime(series, format="ISO8601", utc=True, errors="coerce")
+    lg = time.isna() & series.notna()
+    if lg.any():
+        # fallback for the remaining elements (invalid timestamps become NaT)
+        time[lg] = pd.to_datetime(series[lg].apply(parse_fallback), utc=True, errors="coerce")
+    return time
+
+
+def to_unix_time(t: datetime):
+    return int(t.timestamp() * 1e9)
+
+
+def to_unix_times(time: pd.Series) -> np.ndarray:
+    """converts a column of timestamps to integer nanoseconds since epoch (naive timestamps are treated as UTC)"""
+    return pd.DatetimeIndex(time).as_unit("ns").asi8
+
+
+def is_utc(tz: Union[tzinfo, None]) -> bool:
+    """checks whether a time zone is UTC (regardless of its implementation: datetime, dateutil, pytz, zoneinfo)"""
+    return (tz is not None) and (tz.utcoffset(None) == timedelta(0))
+
+
 re_signal_name_head = re.compile("[\w\-\.:]+(?=\|(\d|[a-cA-Cx-zX-ZsS]))", re.ASCII)
 re_signal_axis = re.compile("([a-cx-z]|sp)\d+", re.IGNORECASE | re.ASCII)
 
@@ -62,6 +145,40 @@ def rename_signal(head: SignalHeaderHF) -> str:
         return head.name
 
 
+class ListHash:
+    """
+    Streaming version of hash_list(): the elements are added one at a time and the hash of all elements so far is
+    available at any time. Only the binary digests after each element are kept (32 bytes per element).
+    """
+    def __init__(self, elements: list = None) -> None:
+        self._hash = hashlib.new('sha256')
+        self._digests = bytearray()
+        self.n_elements = 0
+        if elements is not None:
+            self.update(elements)
+
+    def append(self, element) -> None:
+        # transform to (binary) string and hash every element
+        self._hash.update(str(element).encode())
+        self._digests += self._hash.digest()
+        self.n_elements += 1
+
+    def update(self, elements: list) -> None:
+        update, digest = self._hash.update, self._hash.digest
+        digests = []
+        for el in elements:
+            update(str(el).encode())
+            digests.append(digest())
+        self._digests += b"".join(digests)
+        self.n_elements += len(digests)
+
+    def hexdigest(self) -> str:
+        hash_fnc = self._hash.copy()
+        # hash list of hashes
+        hash_fnc.update(self._digests.hex().encode())
+        return hash_fnc.hexdigest()
+
+
 def hash_list(elements: list) -> str:
     """
     creates a unique hash string for a list.
@@ -74,15 +191,81 @@ def hash_list(elements: list) -> str:
     :param elements: list of elements to hash
     :return: unique hash string
     """
-    hash_fnc = hashlib.new('sha256')
-    tmp = []
-    for el in elements:
-        # transform to (binary) string and hash every element
-        hash_fnc.update(str(el).encode())
-        tmp.append(hash_fnc.hexdigest())
-    # hash list of hashes
-    hash_fnc.update("".join(tmp).encode())
-    return hash_fnc.hexdigest()
+    return ListHash(elements).hexdigest()
+
+
+class MemoryTrace:
+    """
+    Peak memory per stage of a computation, traced by tracemalloc (allocations of python objects and numpy arrays in
+    the current process). Stages may be nested and repeated: the peak of a stage is the maximum over all its runs, the
+    retained memory and the duration are summed up. Tracing slows down the allocation of python objects.
+    """
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = dict()
+        # names of the open stages and their peak so far
+        self._open: List[List] = []
+        self._started = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+    def stop(self) -> None:
+        # keep tracing if it was started by someone else
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def _fold_peak(self) -> None:
+        """adds the peak since the last reset to all open stages"""
+        _, peak = tracemalloc.get_traced_memory()
+        for el in self._open:
+            el[1] = max(el[1], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        traces the code within the context as stage
+        :param name: name of the stage
+        """
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        self._fold_peak()
+        current0, _ = tracemalloc.get_traced_memory()
+        self._open.append([name, current0])
+        t0 = default_timer()
+        try:
+            yield
+        finally:
+            duration = default_timer() - t0
+            self._fold_peak()
+            _, peak = self._open.pop()
+            current, _ = tracemalloc.get_traced_memory()
+            stats = self.stages.setdefault(name, {"peak": 0, "retained": 0, "seconds": 0.0})
+            stats["peak"] = max(stats["peak"], peak)
+            stats["retained"] += current - current0
+            stats["seconds"] += duration
+
+    def iterate(self, iterable, name: str):
+        """traces the iteration (i.e. producing the elements) of an iterable as stage"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                el = next(iterator, StopIteration)
+            if el is StopIteration:
+                return
+            yield el
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        :return: peak traced memory ("peak", bytes), memory that was still allocated at the end ("retained", bytes,
+        negative if the stage released memory of a previous stage) and duration ("seconds") per stage in the order the
+        stages were entered first
+        """
+        return pd.DataFrame.from_dict(self.stages, orient="index", columns=["peak", "retained", "seconds"])
 
 
 def find_changed_rows(df: pd.DataFrame) -> list:
@@ -125,51 +308,203 @@ def check_key_pattern(columns: list, key_pattern: str):
     return None
 
 
+def match_key_patterns(columns: list, key_patterns: list) -> list:
+    """
+    finds all columns that match a list of names or regex patterns. A pattern that is identical to a column name
+    selects only this column.
+    :param columns: column names
+    :param key_patterns: names or regex patterns
+    :return: matching columns in the order of the columns
+    """
+    selected = set()
+    for ky in key_patterns:
+        if ky in columns:
+            selected.add(ky)
+        else:
+            re_ky = re.compile(ky)
+            selected.update(el for el in columns if re_ky.match(el))
+    return [el for el in columns if el in selected]
+
+
 def interplin(
         x: Union[np.ndarray, List[Union[int, float]]],
         xp: Union[np.ndarray, List[Union[int, float]]],
         yp: Union[np.ndarray, List[Union[int, float]]]
-) -> List[Union[int, float]]:
-    # Sort xp and yp together based on the values in xp
-    xp, yp = zip(*sorted(zip(xp, yp)))
-
-    # Convert xp and yp to numpy arrays for efficient computations
-    xp = np.array(xp)
-    yp = np.array(yp)
-
-    interpolated_values = []
-
-    for i in range(len(x)):
-        # Find the index of the closest point in xp that is less than or equal to x[i]
-        idx = np.searchsorted(xp, x[i], side='right') - 1
-
-        if idx == -1:
-            # Extrapolate if x[i] is smaller than the smallest value in xp
-            slope = (yp[1] - yp[0]) / (xp[1] - xp[0])
-            interpolated_value = yp[0] + slope * (x[i] - xp[0])
-            # Check if interpolated value is zero
-            if interpolated_value == 0:
-                # Saturate to the nearest non-zero value
-                idx_nonzero = np.argmax(yp != 0)
-                interpolated_value = yp[idx_nonzero]
-        elif idx == len(xp) - 1:
-            # Extrapolate if x[i] is larger than the largest value in xp
-            slope = (yp[-1] - yp[-2]) / (xp[-1] - xp[-2])
-            interpolated_value = yp[-1] + slope * (x[i] - xp[-1])
-            # Check if interpolated value is zero
-            if interpolated_value == 0:
-                # Saturate to the nearest non-zero value
-                idx_nonzero = np.argmax(yp != 0)
-                interpolated_value = yp[idx_nonzero]
-        else:
-            # Interpolate linearly between the two closest points
-            x_left, x_right = xp[idx], xp[idx + 1]
-            y_left, y_right = yp[idx], yp[idx + 1]
-            slope = (y_right - y_left) / (x_right - x_left)
-            interpolated_value = y_left + slope * (x[i] - x_left)
-
-        interpolated_values.append(interpolated_value)
+) -> np.ndarray:
+    """
+    piecewise linear interpolation with linear extrapolation beyond the support points. Extrapolated values that are
+    exactly zero are saturated to the first non-zero value of yp. Integer values yp (e.g. nanoseconds since epoch)
+    are interpolated relative to their first value and rounded to integers, i.e. without the loss of precision of
+    large float values.
+    :param x: points to evaluate
+    :param xp: support points (need not be sorted)
+    :param yp: values at the support points
+    :return: interpolated values (int64 if yp are integers and all values are finite, float64 otherwise)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    xp = np.asarray(xp)
+    yp = np.asarray(yp)
+
+    # sort xp and yp together based on the values in xp
+    order = np.lexsort((yp, xp))
+    xp, yp = xp[order].astype(np.float64), yp[order]
+
+    # interpolate relative to the first value
+    integer = yp.dtype.kind in "iu"
+    offset = yp[0] if integer else 0
+    yr = (yp - offset).astype(np.float64)
+    y = np.interp(x, xp, yr)
+
+    # extrapolate linearly with the slope of the first / last segment
+    lg_lower = x < xp[0]
+    lg_upper = x > xp[-1]
+    if len(xp) > 1:
+        slope = (yr[1] - yr[0]) / (xp[1] - xp[0])
+        y[lg_lower] = yr[0] + slope * (x[lg_lower] - xp[0])
+        slope = (yr[-1] - yr[-2]) / (xp[-1] - xp[-2])
+        y[lg_upper] = yr[-1] + slope * (x[lg_upper] - xp[-1])
+
+    if integer and np.isfinite(y).all():
+        y = offset + np.rint(y).astype(np.int64)
+    else:
+        y = offset + y
 
-    return interpolated_values
+    # saturate extrapolated zeros to the first non-zero value
+    lg = (lg_lower | lg_upper) & (y == 0)
+    if lg.any():
+        y[lg] = yp[np.argmax(yp != 0)]
+    return y
 
 
+def asof_index(
+        x: np.ndarray,
+        xp: np.ndarray,
+        how: str = "backward",
+        tolerance: Union[int, float] = None
+) -> np.ndarray:
+    """
+    as-of matching of keys: for every key x the position of the last key xp <= x ("backward"), of the first key
+    xp >= x ("forward") or of the closest key ("nearest", the backward match on ties). Equal keys xp are matched by
+    their last ("backward") or first occurrence.
+    :param x: keys to match
+    :param xp: sorted keys
+    :param how: "backward", "forward" or "nearest"
+    :param tolerance: maximum distance between the keys (no limit if None)
+    :return: positions in xp (-1 if there is no match)
+    """
+    x = np.asarray(x)
+    xp = np.asarray(xp)
+    n = len(xp)
+    if n == 0:
+        return np.full(len(x), -1, dtype=np.intp)
+
+    lo = np.searchsorted(xp, x, side="right") - 1
+    if how == "backward":
+        idx = lo
+    elif how in ("forward", "nearest"):
+        hi = np.searchsorted(xp, x, side="left")
+        hi[hi == n] = -1
+        if how == "forward":
+            idx = hi
+        else:
+            # distances to the neighbors (invalid neighbors are infinitely far away)
+            d_lo = np.where(lo >= 0, x - xp[np.maximum(lo, 0)], np.inf)
+            d_hi = np.where(hi >= 0, xp[hi] - x, np.inf)
+            idx = np.where(d_hi < d_lo, hi, lo)
+    else:
+        raise Exception(f"Unknown value how={how}. Use 'backward', 'forward' or 'nearest'.")
+
+    if tolerance is not None:
+        lg = idx >= 0
+        distance = np.abs(x[lg] - xp[idx[lg]])
+        idx[lg] = np.where(distance <= tolerance, idx[lg], -1)
+    return idx
+
+
+def reduce_ranges(
+        values: np.ndarray,
+        starts: np.ndarray,
+        stops: np.ndarray,
+        reductions: List[str] = ("mean", "rms", "min", "max"),
+        percentiles: List[float] = None
+) -> dict:
+    """
+    reduces the rows of a 2-dimensional array over disjoint row ranges [start, stop) for all columns at once
+    (np.ufunc.reduceat). NaN values are ignored; ranges without values yield NaN (0 for "sum" and "count").
+    :param values: array of shape (number of rows, number of signals)
+    :param starts: first row of each range
+    :param stops: row after the last row of each range
+    :param reductions: "mean", "rms", "min", "max", "sum", "count"
+    :param percentiles: percentiles in [0, 100] (linear interpolation)
+    :return: dictionary of reduction (percentiles as "p<q>") and array of shape (number of ranges, number of signals)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    starts = np.asarray(starts, dtype=np.intp)
+    stops = np.asarray(stops, dtype=np.intp)
+    n_rows, n_columns = values.shape
+    n_ranges = len(starts)
+
+    unknown = set(reductions) - {"mean", "rms", "min", "max", "sum", "count"}
+    if unknown:
+        raise Exception(f"Unknown reductions {unknown}. Use 'mean', 'rms', 'min', 'max', 'sum' or 'count'.")
+
+    lg_valid = ~np.isnan(values)
+    lg_empty = starts >= stops
+
+    def reduceat(ufunc, x, fill) -> np.ndarray:
+        if n_ranges == 0:
+            return np.empty((0, n_columns))
+        # alternate starts and stops; a trailing row makes stop == n_rows a valid index
+        x = np.concatenate((x, np.full((1, n_columns), fill, dtype=x.dtype)))
+        indices = np.column_stack((starts, stops)).ravel()
+        out = ufunc.reduceat(x, indices, axis=0)[::2]
+        out[lg_empty] = fill
+        return out
+
+    results = dict()
+    count = reduceat(np.add, lg_valid.astype(np.int64), 0)
+    no_values = count == 0
+    if ("sum" in reductions) or ("mean" in reductions):
+        total = reduceat(np.add, np.where(lg_valid, values, 0), 0)
+        if "sum" in reductions:
+            results["sum"] = total
+        if "mean" in reductions:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                results["mean"] = np.where(no_values, np.nan, total / count)
+    if "rms" in reductions:
+        squares = reduceat(np.add, np.where(lg_valid, values ** 2, 0), 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            results["rms"] = np.where(no_values, np.nan, np.sqrt(squares / count))
+    if "min" in reductions:
+        results["min"] = np.where(no_values, np.nan, reduceat(np.minimum, np.where(lg_valid, values, np.inf), np.inf))
+    if "max" in reductions:
+        results["max"] = np.where(no_values, np.nan, reduceat(np.maximum, np.where(lg_valid, values, -np.inf), -np.inf))
+    if "count" in reductions:
+        results["count"] = count
+
+    for q in percentiles or []:
+        results[f"p{q:g}"] = np.full((n_ranges, n_columns), np.nan)
+    if percentiles and (n_rows > 0):
+        # sort the values within each range (rows outside of the ranges and NaN values are sorted to the end)
+        lengths = np.where(lg_empty, 0, stops - starts)
+        rows = np.repeat(starts, lengths) + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        range_id = np.full(n_rows, n_ranges, dtype=np.intp)
+        range_id[rows] = np.repeat(np.arange(n_ranges), lengths)
+        # first sorted row of each range
+        offsets = np.cumsum(lengths) - lengths
+
+        for j in range(n_columns):
+            # sort by value, then (stable) by range
+            order = np.argsort(values[:, j])
+            x = values[order[np.argsort(range_id[order], kind="stable")], j]
+            valid = ~no_values[:, j]
+            for q in percentiles:
+                # position of the percentile within the valid values of a range
+                pos = (count[valid, j] - 1) * q / 100
+                lo = np.floor(pos).astype(np.intp)
+                hi = np.minimum(lo + 1, count[valid, j] - 1)
+                x_lo, x_hi = x[offsets[valid] + lo], x[offsets[valid] + hi]
+                results[f"p{q:g}"][valid, j] = x_lo + (pos - lo) * (x_hi - x_lo)
+    return results
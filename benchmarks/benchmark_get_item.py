@@ -0,0 +1,70 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import default_timer
+import argparse
+import sys
+import tracemalloc
+
+import numpy as np
+
+# make the package importable when run from the repository root
+sys.path.append(Path(__file__).parents[1].as_posix())
+
+from CaptureDataParser import parse
+from synthetic_recording import create_recording
+
+
+"""
+Measures latency and peak memory (allocations traced by tracemalloc) of typical CapturePayload.get_item() queries on
+a wide HFData table.
+python benchmarks/benchmark_get_item.py --n-parts 4 --n-cycles 50000
+"""
+
+
+def measure(fnc, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = default_timer()
+        fnc()
+        times.append(default_timer() - t0)
+
+    tracemalloc.start()
+    result = fnc()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return np.median(times), peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-parts", type=int, default=4, help="Number of files of the recording")
+    parser.add_argument("--n-cycles", type=int, default=50000, help="Number of HFData rows per file")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of repetitions (median is reported)")
+    opt = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        files = create_recording(Path(tmp), n_parts=opt.n_parts, n_cycles=opt.n_cycles)
+        data = parse(files)
+
+    group = "HFData"
+    df = data.data[group]
+    signals = [el for el in df.columns if el not in ("CYCLE", "Time")]
+    limit = int(df["CYCLE"].iloc[len(df) // 2])
+    print(f"{data}, HFData: {df.memory_usage(deep=False).sum() / 2 ** 20:.1f} MiB")
+
+    queries = {
+        "one signal": lambda: data[group, signals[0]],
+        "one signal, timeseries": lambda: data[group, signals[0], "timeseries"],
+        "3 signals, timeseries": lambda: data.get_item(group, signals[:3], index_as="timeseries"),
+        "3 signals, not_na": lambda: data.get_item(group, signals[:3], not_na=True),
+        "3 signals, limit_to": lambda: data.get_item(group, signals[:3], limit_to=limit),
+        "all, limit_to, timeseries": lambda: data.get_item(group, limit_to=limit, index_as="timeseries"),
+    }
+    for name, fnc in queries.items():
+        try:
+            t, peak = measure(fnc, opt.repeat)
+        except Exception as ex:
+            print(f"{name:28s} failed: {ex!r}")
+            continue
+        print(f"{name:28s} {t * 1e3:8.3f} ms {peak / 2 ** 20:8.2f} MiB")
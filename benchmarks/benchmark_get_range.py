@@ -0,0 +1,69 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import default_timer
+import argparse
+import sys
+
+import numpy as np
+
+# make the package importable when run from the repository root
+sys.path.append(Path(__file__).parents[1].as_posix())
+
+from CaptureDataParser import parse
+from synthetic_recording import create_recording
+
+
+"""
+Compares windowed queries by a boolean mask over the whole group (the former implementation of limit_to) with the
+binary search on the sorted indexes of CapturePayload.get_range().
+python benchmarks/benchmark_get_range.py --n-parts 10 --n-cycles 50000 --n-queries 200
+"""
+
+
+def query_mask(data, group: str, start: int, stop: int):
+    df = data.data[group]
+    lg = (df["CYCLE"] >= start) & (df["CYCLE"] < stop)
+    return df[lg]
+
+
+def timeit(fnc, windows) -> float:
+    t0 = default_timer()
+    for start, stop in windows:
+        fnc(start, stop)
+    return default_timer() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-parts", type=int, default=10, help="Number of files of the recording")
+    parser.add_argument("--n-cycles", type=int, default=50000, help="Number of HFData rows per file")
+    parser.add_argument("--n-queries", type=int, default=200, help="Number of windowed queries")
+    parser.add_argument("--window", type=int, default=1000, help="Number of cycles per window")
+    opt = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        files = create_recording(Path(tmp), n_parts=opt.n_parts, n_cycles=opt.n_cycles)
+        data = parse(files)
+
+    group = "HFData"
+    cycle = data[group, "CYCLE"]
+    rng = np.random.default_rng(0)
+    starts = rng.integers(cycle.iloc[0], cycle.iloc[-1] - opt.window, size=opt.n_queries)
+    windows = [(int(el), int(el) + opt.window) for el in starts]
+    print(f"{data}, {opt.n_queries} queries of {opt.window} cycles")
+
+    # build the sorted index once (cached afterwards)
+    t0 = default_timer()
+    data.get_range(group, *windows[0])
+    print(f"sorted index: {(default_timer() - t0) * 1e3:8.2f} ms")
+
+    t_mask = timeit(lambda a, b: query_mask(data, group, a, b), windows)
+    t_range = timeit(lambda a, b: data.get_range(group, a, b), windows)
+    print(f"mask:         {t_mask / opt.n_queries * 1e3:8.3f} ms / query")
+    print(f"get_range:    {t_range / opt.n_queries * 1e3:8.3f} ms / query (speedup {t_mask / t_range:.1f}x)")
+
+    # limit_to (prefix of the group)
+    t_mask = timeit(lambda a, b: data.data[group][data.data[group]["CYCLE"] < b], windows)
+    t_limit = timeit(lambda a, b: data.get_item(group, limit_to=b), windows)
+    print(f"limit_to mask:{t_mask / opt.n_queries * 1e3:8.3f} ms / query")
+    print(f"limit_to:     {t_limit / opt.n_queries * 1e3:8.3f} ms / query (speedup {t_mask / t_limit:.1f}x)")
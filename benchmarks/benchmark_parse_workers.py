@@ -0,0 +1,46 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import default_timer
+import argparse
+import os
+import sys
+
+# make the package importable when run from the repository root
+sys.path.append(Path(__file__).parents[1].as_posix())
+
+from CaptureDataParser import parse
+from synthetic_recording import create_recording
+
+
+"""
+Compares sequential and process-parallel parsing of a synthetic chained recording.
+python benchmarks/benchmark_parse_workers.py --n-parts 20 --n-cycles 20000
+"""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-parts", type=int, default=20, help="Number of files of the recording")
+    parser.add_argument("--n-cycles", type=int, default=20000, help="Number of HFData rows per file")
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Number of workers to compare")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions (minimum is reported)")
+    opt = parser.parse_args()
+
+    # parse() uses at most one process per CPU
+    workers = sorted({min(n, os.cpu_count()) for n in (opt.workers or [1, 2, 4, 8, os.cpu_count()])})
+
+    with TemporaryDirectory() as tmp:
+        files = create_recording(Path(tmp), n_parts=opt.n_parts, n_cycles=opt.n_cycles)
+        size = sum(fl.stat().st_size for fl in files) / 2 ** 20
+        print(f"{opt.n_parts} parts, {size:.0f} MiB, {os.cpu_count()} CPUs")
+
+        t_ref = None
+        for n in workers:
+            times = []
+            for _ in range(opt.repeat):
+                t0 = default_timer()
+                data = parse(files, rename_hfdata=True, workers=n)
+                times.append(default_timer() - t0)
+            t = min(times)
+            t_ref = t if t_ref is None else t_ref
+            print(f"workers={n:2d}: {t:6.2f} s (speedup {t_ref / t:.2f}x) {data}")
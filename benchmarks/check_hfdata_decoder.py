@@ -0,0 +1,54 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+# make the package importable when run from the repository root
+sys.path.append(Path(__file__).parents[1].as_posix())
+
+from CaptureDataParser.HeaderData import SignalHeaderHF
+from CaptureDataParser.parse_payload import HFDataDecoder
+
+
+"""
+Checks the column-wise HFData decoder against building a dictionary per row, including ragged rows.
+python benchmarks/check_hfdata_decoder.py
+"""
+
+
+SIGNALS = [
+    SignalHeaderHF(name="CYCLE", dtype=int, axis="Cycle", address="CYCLE"),
+    SignalHeaderHF(name="TORQUE|1", dtype=np.double, axis="X1", address="TORQUE|1"),
+    SignalHeaderHF(name="STATE|1", dtype=str, axis="X1", address="STATE|1"),
+    SignalHeaderHF(name="ENC_POS|1", dtype=int, axis="X1", address="ENC_POS|1"),
+]
+
+
+def reference(rows: list, signals: list) -> pd.DataFrame:
+    """row-wise decoding: one dictionary per row, missing values become NaN"""
+    return pd.DataFrame([{hd.name: hd.dtype(el) for el, hd in zip(row, signals)} for row in rows])
+
+
+def decode(rows: list, signals: list, chunk_size: int) -> pd.DataFrame:
+    decoder = HFDataDecoder(signals, chunk_size=chunk_size)
+    for i in range(0, len(rows), 3):
+        decoder.append(rows[i:i + 3])
+    return decoder.to_frame()
+
+
+if __name__ == "__main__":
+    rows = [[i, 0.5 * i, f"s{i}", 10 * i] for i in range(20)]
+    cases = {
+        "complete": rows,
+        # last columns missing in a single row
+        "ragged": rows[:7] + [[7, 3.5]] + rows[8:],
+        # a string column missing in a row
+        "ragged string": rows[:4] + [[4, 2.0]] + rows[5:],
+    }
+    for name, case in cases.items():
+        expected = reference(case, SIGNALS)
+        for chunk_size in [1, 4, 100]:
+            pd.testing.assert_frame_equal(decode(case, SIGNALS, chunk_size), expected)
+        print(f"{name}: {dict(expected.dtypes.astype(str))}")
+    print("ok")
@@ -0,0 +1,129 @@
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+import json
+import numpy as np
+
+from typing import Union, List
+
+
+"""
+Creates synthetic (chained) recordings in the format of Capture4Analysis for benchmarking.
+"""
+
+
+HF_SIGNALS = ["CMD_SPEED", "CONT_DEV", "VEL_FFW", "TORQUE_FFW", "TORQUE", "POWER", "CURRENT", "LOAD", "ENC_POS", "DES_POS"]
+AXES = ["X1", "Y1", "Z1", "C1", "B1", "SP1"]
+LF_SIGNALS = [
+    ("/Channel/State/actToolIdent", "String"),
+    ("/Channel/State/actTNumber", "UInt"),
+    ("/Channel/State/actToolLength1", "Double"),
+    ("/Channel/State/actToolLength2", "Double"),
+    ("/Channel/State/actToolRadius", "Double"),
+]
+
+
+def to_iso(t: datetime) -> str:
+    return t.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def create_header(start_time: datetime, start_counter: int) -> dict:
+    signals_hf = [{"Name": "CYCLE", "Type": "INTEGER", "Axis": "Cycle", "Address": "CYCLE"}]
+    for name in HF_SIGNALS:
+        for i, axis in enumerate(AXES):
+            signals_hf.append({"Name": f"{name}|{i + 1}", "Type": "DOUBLE", "Axis": axis, "Address": f"{name}|{i + 1}"})
+
+    signals_lf = [
+        {"id": str(i), "device": address, "path": address, "label": "", "samplingPeriod": 500}
+        for i, (address, _) in enumerate(LF_SIGNALS)
+    ]
+    return {
+        "Version": {"outputFileFormatVersion": "1.0", "RecorderVersion": "3.1.0-36"},
+        "Format": "DEFAULT",
+        "Description": None,
+        "MachineInfo": {"MachineName": "synthetic", "CFCard": "0000"},
+        "JobDescription": ['"TriggersOn":{"activeTool":"6"}', '"TriggersOff":{"ncCode":"M6"}'],
+        "TimeStamp": to_iso(start_time),
+        "CycleTimeMs": 2,
+        "Initial": {"Time": to_iso(start_time), "HFProbeCounter": start_counter},
+        "SignalListHFData": signals_hf,
+        "SignalListLFData": signals_lf,
+        "Metadata": []
+    }
+
+
+def create_payload(counter: int, start_time: datetime, start_counter: int, n_cycles: int, rng) -> List[dict]:
+    payload = []
+    n_cols = len(HF_SIGNALS) * len(AXES)
+    rows_per_message = 25
+    for i in range(0, n_cycles, rows_per_message):
+        k = min(rows_per_message, n_cycles - i)
+        values = np.round(rng.normal(size=(k, n_cols)), 6).tolist()
+        payload.append({"HFData": [[counter + i + j] + row for j, row in enumerate(values)]})
+
+        c = counter + i
+        time = start_time + timedelta(milliseconds=2 * (c - start_counter))
+        if i % 100 == 0:
+            payload.append({"HFTimestamp": {"Time": to_iso(time), "HFProbeCounter": c}})
+        if i % 200 == 0:
+            payload.append({"HFBlockEvent": {
+                "HFProbeCounter": c, "Channel": 1, "SeekOffset": i, "SelectedTool": 6, "ActiveTool": 6,
+                "GCode": f"N{c // 200} G1 X{rng.integers(100)} F1000", "IpoGC": "G1", "ipoReadError": None, "laBuf": 0
+            }})
+        if i % 1000 == 0:
+            payload.append({"HFCallEvent": {
+                "HFProbeCounter": c, "Channel": 1, "SeekOffset": i, "CallStackLevel": 2, "Path": "/_CUTTING"
+            }})
+        if i % 250 == 0:
+            payload.append({"LFData": [
+                {"HFProbeCounter": c, "timestamp": time.isoformat().replace("+00:00", "Z"), "address": address,
+                 "value_type": value_type, "value": "182437" if value_type == "String" else "6"}
+                for address, value_type in LF_SIGNALS
+            ]})
+    return payload
+
+
+def create_recording(
+        folder: Union[Path, str],
+        n_parts: int = 20,
+        n_cycles: int = 20000,
+        name: str = "synthetic",
+        seed: int = 0
+) -> List[Path]:
+    """
+    writes a chained recording
+    :param folder: destination folder
+    :param n_parts: number of files of the recording
+    :param n_cycles: number of HFData rows per file
+    :param name: name stem of the files
+    :param seed: seed of the random number generator
+    :return: list of files
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    start_time = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    start_counter = 1000000
+    filenames = [f"{name}_{i}.json" for i in range(n_parts)]
+
+    files = []
+    for i, filename in enumerate(filenames):
+        counter = start_counter + i * n_cycles
+        recording = {
+            "Header": create_header(start_time, start_counter),
+            "Payload": create_payload(counter, start_time, start_counter, n_cycles, rng),
+            "Footer": {
+                "ErrorMessages": [],
+                "FilePathChain": {
+                    "Previous": filenames[i - 1] if i > 0 else None,
+                    "Actual": filename,
+                    "Next": filenames[i + 1] if i < n_parts - 1 else None,
+                    "Index": i + 1,
+                    "StreamIndex": None
+                }
+            }
+        }
+        with open(folder / filename, "w", encoding="utf-8") as fid:
+            json.dump(recording, fid)
+        files.append(folder / filename)
+    return files
@@ -34,7 +34,8 @@ if __name__ == "__main__":
     parser.add_argument("--in-seconds", action="store_true",
                         help="Window size and limit will be interpreted as a time value.")
     parser.add_argument("--method", type=str, default="rms",
-                        help="Aggregation method. Can be 'rms', 'sum', 'mean', 'absSum', or 'absMean'.")
+                        help="Aggregation method. Can be 'rms', 'sum', 'mean', 'median', 'min', 'max' "
+                             "or their absolute variants, e.g. 'absSum' or 'absMean'.")
     # meta data
     parser.add_argument("--path-to-metadata", type=str, default=None,
                         help="Metadata file or file pattern (usually called 'info.csv')")
@@ -94,7 +95,7 @@ if __name__ == "__main__":
         ):
             lines = []
             highlight = []
-            for fl, df in get_files(files=files, start_index=opt.start_index):
+            for fl, df in get_files(files=files, start_index=opt.start_index, columns=[key_sig, "Time"]):
                 sig = get_signal(
                     df,
                     key_sig,
@@ -33,7 +33,7 @@ def get_data_characteristics(
             file_extension=file_extension,
             path_to_metadata=path_to_metadata,
             filter_keys=filter_key
-    ), start_index=start_index):
+    ), start_index=start_index, columns=list(signals) + ["Time"]):
         for key in signals:
             sig = get_signal(df, key, in_seconds=in_seconds)
 
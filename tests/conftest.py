@@ -0,0 +1,5 @@
+from pathlib import Path
+import sys
+
+# make the package importable when pytest is run from any directory
+sys.path.append(Path(__file__).parents[1].as_posix())
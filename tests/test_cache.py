@@ -0,0 +1,89 @@
+from pathlib import Path
+import shutil
+
+import pytest
+
+from CaptureDataParser import parse, ParseCache
+from CaptureDataParser.CapturePayload import CapturePayload
+
+
+EXAMPLE = next((Path(__file__).parents[1] / "example").glob("*.json"))
+
+
+@pytest.fixture
+def recording(tmp_path) -> Path:
+    file = tmp_path / "recording" / EXAMPLE.name
+    file.parent.mkdir()
+    shutil.copy(EXAMPLE, file)
+    return file
+
+
+class Counter:
+    """parse function that counts its calls"""
+    def __init__(self, file: Path, **kwargs) -> None:
+        self.file = file
+        self.kwargs = kwargs
+        self.calls = 0
+
+    def __call__(self) -> CapturePayload:
+        self.calls += 1
+        return parse(self.file, **self.kwargs)
+
+
+def assert_equal_payloads(a: CapturePayload, b: CapturePayload) -> None:
+    assert list(a.data) == list(b.data)
+    for ky in a.data:
+        assert a.data[ky].equals(b.data[ky]), ky
+    assert a.fingerprints == b.fingerprints
+
+
+def test_hit_and_miss(tmp_path, recording):
+    cache = ParseCache(tmp_path / "cache")
+    fnc = Counter(recording)
+    options = {"rename_hfdata": False}
+
+    first = cache.get([recording], options, fnc)
+    second = cache.get([recording], options, fnc)
+    assert fnc.calls == 1
+    assert_equal_payloads(first, second)
+
+    # other options
+    cache.get([recording], {"rename_hfdata": True}, fnc)
+    assert fnc.calls == 2
+
+    # changed content
+    with open(recording, "a") as fid:
+        fid.write(" ")
+    cache.get([recording], options, fnc)
+    assert fnc.calls == 3
+
+
+def test_parse_with_cache(tmp_path, recording):
+    data = parse(recording, cache=tmp_path / "cache")
+    cached = parse(recording, cache=tmp_path / "cache")
+    lazy = parse(recording, cache=tmp_path / "cache", lazy=True)
+    assert_equal_payloads(data, cached)
+    assert_equal_payloads(data, lazy)
+    assert (tmp_path / "cache").stat().st_mode & 0o777 == 0o700
+
+
+def test_lazy_load_after_eviction(tmp_path, recording):
+    cache = ParseCache(tmp_path / "cache")
+    fnc = Counter(recording)
+    data = cache.get([recording], {}, fnc)
+    lazy = cache.get([recording], {}, fnc, lazy=True)
+    assert fnc.calls == 1
+
+    # another process evicts the entry before the groups are loaded
+    for fl in (tmp_path / "cache").glob(f"*{ParseCache.suffix}"):
+        fl.unlink()
+    assert_equal_payloads(data, lazy)
+    assert fnc.calls == 2
+
+
+def test_evict(tmp_path, recording):
+    cache = ParseCache(tmp_path / "cache", max_size=1)
+    fnc = Counter(recording)
+    cache.get([recording], {}, fnc)
+    # the entry exceeds the maximum size
+    assert not list((tmp_path / "cache").glob(f"*{ParseCache.suffix}"))
@@ -0,0 +1,81 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from CaptureDataParser.CapturePayload import CapturePayload
+
+
+def make_payload(sorted_counter: bool = True) -> CapturePayload:
+    rng = np.random.default_rng(0)
+    n = 1000
+    counter = np.arange(5000, 5000 + n, dtype=np.int64)
+    if not sorted_counter:
+        # counter reset in the middle of the recording
+        counter[n // 2:] -= 4000
+    time = pd.Series(pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(np.arange(n) * 2, unit="ms"))
+    hfdata = pd.DataFrame({"CYCLE": counter, "CURRENT|1": rng.normal(size=n), "Time": time})
+    # events at random counters (including ties and events before the first cycle)
+    events = np.sort(rng.choice(np.arange(4990, 5000 + n + 10), size=60))
+    blocks = pd.DataFrame({
+        "HFProbeCounter": events,
+        "GCode": [f"N{i}" for i in range(len(events))],
+        "Time": pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta((events - 5000) * 2, unit="ms"),
+    })
+    return CapturePayload({"HFData": hfdata, "HFBlockEvent": blocks})
+
+
+@pytest.mark.parametrize("sorted_counter", [True, False])
+@pytest.mark.parametrize("start, stop", [(None, None), (None, 5100), (5100, 5300), (5300, 5300), (900, 1200), (7000, None)])
+def test_get_range_equals_mask(sorted_counter, start, stop):
+    payload = make_payload(sorted_counter)
+    df = payload.data["HFData"]
+    lg = np.ones(len(df), dtype=bool)
+    if start is not None:
+        lg &= df["CYCLE"].to_numpy() >= start
+    if stop is not None:
+        lg &= df["CYCLE"].to_numpy() < stop
+    pd.testing.assert_frame_equal(payload.get_range("HFData", start, stop), df[lg])
+
+
+def test_get_range_by_time_equals_mask():
+    payload = make_payload()
+    df = payload.data["HFData"]
+    start = datetime.datetime(2024, 1, 1, 0, 0, 0, 100000, tzinfo=datetime.timezone.utc)
+    stop = datetime.datetime(2024, 1, 1, 0, 0, 1, tzinfo=datetime.timezone.utc)
+    lg = (df["Time"] >= start) & (df["Time"] < stop)
+    pd.testing.assert_frame_equal(payload.get_range("HFData", start, stop, by="time"), df[lg])
+
+
+def test_get_range_after_replacing_group():
+    payload = make_payload()
+    payload.get_range("HFData", 5100, 5200)
+    payload.data["HFData"] = payload.data["HFData"].iloc[:50]
+    assert len(payload.get_range("HFData", 5000, 5200)) == 50
+
+
+@pytest.mark.parametrize("how, direction", [("backward", "backward"), ("forward", "forward"), ("nearest", "nearest")])
+@pytest.mark.parametrize("tolerance", [None, 3])
+def test_align_equals_merge_asof(how, direction, tolerance):
+    payload = make_payload()
+    hfdata = payload.data["HFData"]
+    blocks = payload.data["HFBlockEvent"]
+    if how == "nearest":
+        # ties of the distance are resolved differently
+        blocks = blocks.drop_duplicates("HFProbeCounter")
+        payload.data["HFBlockEvent"] = blocks
+
+    aligned = payload.align("HFBlockEvent", signals={"HFBlockEvent": ["GCode"]}, how=how, tolerance=tolerance)
+    # merge_asof takes the last event of ties backward and the first event of ties forward
+    right = blocks.drop_duplicates("HFProbeCounter", keep="first") if how == "forward" else blocks
+    expected = pd.merge_asof(
+        hfdata[["CYCLE"]],
+        right[["HFProbeCounter", "GCode"]],
+        left_on="CYCLE",
+        right_on="HFProbeCounter",
+        direction=direction,
+        tolerance=tolerance
+    )
+    assert aligned["CYCLE"].tolist() == hfdata["CYCLE"].tolist()
+    assert aligned["GCode"].tolist() == expected["GCode"].tolist()
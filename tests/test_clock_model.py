@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from CaptureDataParser.ClockModel import ClockModel
+
+
+# nanoseconds per count (2 ms cycle time)
+SLOPE = 2e6
+
+
+def support_points():
+    """two epochs: counters 5.0e6 .. 5.1e6, reset, 0 .. 1e5 (one second later)"""
+    c0 = np.arange(5_000_000, 5_100_001, 1000)
+    t0 = (c0 - c0[0]) * SLOPE
+    c1 = np.arange(0, 100_001, 1000)
+    t1 = t0[-1] + 1e9 + c1 * SLOPE
+    return np.r_[c0, c1], np.r_[t0, t1].astype(np.int64)
+
+
+def test_linear():
+    counter = np.arange(0, 10_000, 100)
+    time = (1_700_000_000_000_000_000 + counter * SLOPE).astype(np.int64)
+    model = ClockModel.fit(counter, time, nominal_cycle_time=2)
+    assert len(model.segments) == 1
+    assert model.cycle_time == pytest.approx(2)
+    assert model.drift == pytest.approx(0, abs=1e-9)
+    np.testing.assert_array_equal(model.evaluate([50, 150]), time[0] + np.array([50, 150]) * int(SLOPE))
+
+
+def test_outlier_is_excluded():
+    counter = np.arange(0, 10_000, 100)
+    time = (counter * SLOPE).astype(np.int64)
+    time[40] += 500_000_000
+    model = ClockModel.fit(counter, time)
+    assert model.n_outliers == 1
+    assert not model.inliers[40]
+    assert len(model.segments) == 1
+    assert model.max_abs < 1
+    # interpolation ignores the outlier
+    assert model.interpolate([counter[40]])[0] == counter[40] * SLOPE
+
+
+def test_jump_starts_segment():
+    counter = np.arange(0, 10_000, 100)
+    time = (counter * SLOPE).astype(np.int64)
+    time[50:] += 1_000_000_000
+    model = ClockModel.fit(counter, time)
+    assert (model.n_resets, model.n_outliers, len(model.segments)) == (0, 0, 2)
+    np.testing.assert_array_equal(model.evaluate(counter), time)
+
+
+def test_resets():
+    counter, time = support_points()
+    model = ClockModel.fit(counter, time)
+    assert model.n_resets == 1
+    assert [el.epoch for el in model.segments] == [0, 1]
+    # all values in the order of the recording
+    np.testing.assert_array_equal(model.evaluate(counter), time)
+    np.testing.assert_array_equal(model.interpolate(counter), time)
+
+
+@pytest.mark.parametrize("method", ["fit", "interpolate"])
+def test_counters_after_reset(method):
+    counter, time = support_points()
+    model = ClockModel.fit(counter, time)
+    epoch1 = counter < 1_000_000
+    # queried later: values of the second epoch only (and beyond its last timestamp)
+    query = np.array([100, 200, 50_500, 100_500])
+    expected = time[epoch1][0] + query * SLOPE
+    y = model.interpolate(query) if method == "interpolate" else model.evaluate(query)
+    np.testing.assert_array_equal(y[:3], expected[:3])
+    assert model.evaluate(query)[-1] == expected[-1]
+    # values of the first epoch only
+    np.testing.assert_array_equal(model.evaluate(counter[~epoch1][:5]), time[~epoch1][:5])
+
+
+def test_ambiguous_counters_are_rejected():
+    counter, time = support_points()
+    # both epochs start at 0
+    counter[counter >= 5_000_000] -= 5_000_000
+    model = ClockModel.fit(counter, time)
+    with pytest.raises(Exception):
+        model.evaluate([100, 200])
+    # first timestamp after the reset
+    start = time[np.flatnonzero(np.diff(counter) < 0)[0] + 1]
+    assert model.evaluate([100, 200], epoch=1)[0] == start + 100 * SLOPE
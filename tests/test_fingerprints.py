@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from CaptureDataParser import parse
+from CaptureDataParser.Fingerprints import Fingerprints
+from CaptureDataParser.utils import hash_list
+
+
+EXAMPLE = next((Path(__file__).parents[1] / "example").glob("*.json"))
+
+
+@pytest.mark.parametrize("blocks", [
+    [{"GCode": "G1 X1"}, {"GCode": "G1 X2"}],
+    # null and missing GCode
+    [{"GCode": "a"}, {"GCode": None}, {"x": 1}],
+    [{"GCode": None}, {"GCode": "b"}],
+])
+def test_g_code_hash_equals_frame_column(blocks):
+    fingerprints = Fingerprints()
+    # streaming: one update per part of a recording
+    fingerprints.update(blocks[:1])
+    fingerprints.update(blocks[1:])
+    assert fingerprints.to_dict()["g_code"] == hash_list(pd.DataFrame(blocks)["GCode"])
+
+
+def test_g_code_hash_of_recording():
+    data = parse(EXAMPLE)
+    assert data.fingerprints["g_code"] == hash_list(data.data["HFBlockEvent"]["GCode"])
@@ -1,13 +1,19 @@
 import warnings
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import json
+import os
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
 import logging
 
-from typing import List
+from typing import List, Dict, Any, Union, Tuple
 
 from CaptureDataParser import CapturePayload, parse
+from CaptureDataParser.parse_footer import find_chains
+from CaptureDataParser.parse_header import read_header
 from CaptureDataParser.utils import find_changed_rows, check_key_pattern
 
 
@@ -27,7 +33,7 @@ def get_tool_info(payload: CapturePayload, keys: List[str] = None) -> (pd.DataFr
             '/Channel/State/actToolIdent',
             '/Channel/State/actTNumber'
         ]
-    tool = payload.get_item("LFData", keys + [index], not_na=True).ffill().bfill().drop_duplicates()
+    tool = payload.get_item("LFData", keys + [index], not_na=True, ffill=True).bfill().drop_duplicates()
 
     keys_tool = [el for el in tool.columns if el != index]
     # ignore rows where both lengths and the radius is 0
@@ -48,16 +54,260 @@ def get_tool_info(payload: CapturePayload, keys: List[str] = None) -> (pd.DataFr
     return tool.loc[idx_, keys_tool], tool.loc[idx_, index]
 
 
+# LFData signal of the tool number (partition of the columnar export)
+key_tool_number = '/Channel/State/actTNumber'
+
+
+def transform_recording(
+        files: List[Path],
+        folder_export: Path,
+        keys_toolinfo: List[str],
+        only_info: bool = False,
+        compression: str = None,
+        cache: str = None,
+        file_format: str = "csv"
+) -> Tuple[Union[Dict[str, Any], None], Union[Dict[str, Any], None]]:
+    """
+    parses a recording, extracts its information (G-code hash, tool, size, date) and exports its HFData
+    :param files: files of the recording (all in the same folder)
+    :param folder_export: destination directory
+    :param keys_toolinfo: LFData signals of the tool information
+    :param only_info: do not export HFData
+    :param compression: compression of the exported file
+    :param cache: directory of a cache of parsed recordings
+    :param file_format: "csv" (one file per recording in the destination) or "parquet" / "feather" (columnar files in
+    a dataset partitioned by machine, tool number and G-code hash, see partition())
+    :return: information row (None if the G-code could not be hashed), exported file ("file": name, "checksum":
+    SHA-256, "stat": size and modification time; None if not exported)
+    """
+    foldername = files[0].parent.name
+    logging.debug(f"Current folder: {foldername}")
+
+    # information only needs the tool (LFData), the G code (HFBlockEvent), and the cycles of HFData
+    kwargs = {"groups": ["HFData", "LFData", "HFBlockEvent"], "signals": {"HFData": []}} if only_info else dict()
+    # parse file
+    try:
+        data = parse(files, rename_hfdata=True, cache=cache, **kwargs)
+    except Exception as ex:
+        raise Exception(f"Failed to parse {foldername} with exception") from ex
+
+    try:
+        # create unique hash from G code
+        id = data.hash_g_code()
+    except Exception as ex:
+        warnings.warn(
+            f"Failed to hash G-code of {foldername} with exception: {ex}"
+            "\nSkipping this file."
+        )
+        return None, None
+
+    try:
+        # extract tool information and limit signals to this exact tool
+        tool_info, lim = get_tool_info(data, keys_toolinfo)
+    except Exception as ex:
+        raise Exception(f"Failed to get tool info {foldername} with the exception: {ex}")
+
+    n_rows = len(data.get_item("HFData", limit_to=lim))
+    # number of columns of the full table (even if not all signals were decoded)
+    n_cols = data.shapes["HFData"][1]
+    info = {
+        "filename": foldername,
+        "n_rows": n_rows, "n_cols": n_cols,
+        "date": data["HFData", "Time"][0],
+        **tool_info,
+        "G code hash": id,
+    }
+
+    # export HFData
+    export = None
+    if not only_info:
+        columns_to_exclude = ["CYCLE", "HFProbeCounter"]
+        columns = [el for el in data["HFData"].columns if el not in columns_to_exclude]
+
+        df = data.get_item("HFData", columns, not_na=True, limit_to=lim)
+
+        # construct export file name
+        if file_format == "csv":
+            suffix_export_file = f".{compression}" if compression is not None else ".csv"
+            filename_export = (folder_export / foldername).with_suffix(suffix_export_file)
+        else:
+            tool_number = next((vl for ky, vl in tool_info.items() if ky.startswith(key_tool_number)), None)
+            filename_export = folder_export / partition(read_header(files[0]).machine.name, tool_number, id) / \
+                f"{foldername}.{file_format}"
+        # export (written to a temporary folder first, i.e. an interrupted export never looks complete)
+        filename_tmp = folder_export / ".partial" / filename_export.name
+        filename_tmp.parent.mkdir(exist_ok=True)
+        if file_format == "csv":
+            df.to_csv(filename_tmp, header=True, index=False, compression=compression)
+        else:
+            # keep the data types of the header (e.g. float32 for FLOAT) and the timestamps
+            kwargs = {"compression": compression} if compression is not None else dict()
+            if file_format == "parquet":
+                df.to_parquet(filename_tmp, index=False, **kwargs)
+            elif file_format == "feather":
+                df.reset_index(drop=True).to_feather(filename_tmp, **kwargs)
+            else:
+                raise Exception(f"Unknown file format {file_format}. Use 'csv', 'parquet' or 'feather'.")
+        with open(filename_tmp, "rb") as fid:
+            checksum = hashlib.file_digest(fid, "sha256").hexdigest()
+        filename_export.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(filename_tmp, filename_export)
+        export = {
+            "file": filename_export.relative_to(folder_export).as_posix(),
+            "checksum": checksum,
+            "stat": file_stat(filename_export)
+        }
+    return info, export
+
+
+def partition(machine: str, tool_number: Any, g_code_hash: str) -> Path:
+    """
+    folder of a recording in the columnar dataset (hive-style partitions, i.e. the partitions are columns when the
+    dataset is read as a whole, e.g. by pd.read_parquet(folder))
+    :param machine: name of the machine
+    :param tool_number: tool (T) number
+    :param g_code_hash: hash of the G-code
+    :return: relative path hfdata/machine=<machine>/tool=<tool number>/gcode=<hash>
+    """
+    if isinstance(tool_number, float) and tool_number.is_integer():
+        tool_number = int(tool_number)
+    parts = {"machine": machine, "tool": tool_number, "gcode": g_code_hash}
+    return Path("hfdata", *[f"{ky}={str(vl).replace('/', '_')}" for ky, vl in parts.items()])
+
+
+def file_stat(file: Path) -> List[int]:
+    """size and modification time (ns) of a file"""
+    stat = file.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class Manifest:
+    """
+    Record of the transformed recordings stored as JSON lines in the destination. Per recording folder, it holds the
+    size and modification time of the input files, the options, the exported file (name, checksum, size and
+    modification time) and the information row. A record is appended as soon as a folder is finished (the last record
+    of a folder is valid), so that an interrupted run resumes with the remaining folders and a re-run only transforms
+    new or changed recordings.
+    """
+    def __init__(self, file: Path) -> None:
+        """
+        :param file: manifest file (created if it does not exist)
+        """
+        self.file = file
+        self.records: Dict[str, Dict[str, Any]] = dict()
+
+        if self.file.exists():
+            with open(self.file, "r") as fid:
+                lines = fid.readlines()
+            n_lines = len(lines)
+            if lines and not lines[-1].endswith("\n"):
+                # drop the line that was not written completely
+                lines = lines[:-1]
+            for el in lines:
+                record = json.loads(el)
+                self.records[record["folder"]] = record
+            if len(self.records) < n_lines:
+                # drop outdated records
+                self._write()
+
+    def _write(self) -> None:
+        tmp = self.file.with_name(f".{self.file.name}.tmp")
+        with open(tmp, "w") as fid:
+            fid.writelines(json.dumps(el) + "\n" for el in self.records.values())
+        os.replace(tmp, self.file)
+
+    @staticmethod
+    def inputs(folder: Path) -> Dict[str, List[int]]:
+        """size and modification time of the recording files of a folder"""
+        return {fl.relative_to(folder).as_posix(): file_stat(fl) for fl in sorted(folder.glob("**/*.json"))}
+
+    def is_done(
+            self,
+            folder: Path,
+            options: Dict[str, Any],
+            inputs: Dict[str, List[int]],
+            folder_export: Path
+    ) -> bool:
+        """
+        the recording was transformed with the same inputs and options (and its exported file is unchanged)
+        :param folder: recording folder
+        :param options: options of the run
+        :param inputs: size and modification time of the recording files (see inputs())
+        :param folder_export: destination directory
+        """
+        record = self.records.get(folder.name)
+        if (record is None) or (record["inputs"] != inputs):
+            return False
+        if options["only_info"]:
+            # the information does not depend on the export
+            return True
+        if record["options"] != options:
+            return False
+        export = record["export"]
+        if export is None:
+            # skipped folder
+            return record["info"] is None
+        filename_export = folder_export / export["file"]
+        return filename_export.exists() and (file_stat(filename_export) == export["stat"])
+
+    def add(
+            self,
+            foldername: str,
+            options: Dict[str, Any],
+            inputs: Dict[str, List[int]],
+            info: Union[Dict[str, Any], None],
+            export: Union[Dict[str, Any], None]
+    ) -> None:
+        """records a finished folder"""
+        def to_json(x):
+            return x.item() if isinstance(x, np.generic) else str(x)
+
+        record = {"folder": foldername, "inputs": inputs, "options": options, "export": export, "info": info}
+        line = json.dumps(record, default=to_json)
+        with open(self.file, "a") as fid:
+            fid.write(line + "\n")
+        # as read back from the file
+        self.records[foldername] = json.loads(line)
+
+    def to_frame(self, folders: List[str] = None) -> pd.DataFrame:
+        """
+        information rows sorted by recording date (ties in the order of the folder names)
+        :param folders: only these folders (all if None)
+        """
+        if folders is None:
+            folders = list(self.records)
+        infos = [self.records[ky]["info"] for ky in sorted(folders) if ky in self.records]
+        df = pd.DataFrame([el for el in infos if el is not None])
+        if len(df) > 1:
+            df["date"] = pd.to_datetime(df["date"], format="ISO8601")
+            df.sort_values(by="date", kind="stable", inplace=True, ignore_index=True)
+        return df
+
+
 if __name__ == "__main__":
     parser = default_argument_parser()
     parser.add_argument("--only-info", action="store_true", help="Do not export files, just collect information")
     parser.add_argument("--no-overwrite", action="store_true", help="Do not not overwrite existing files")
     parser.add_argument("--compression", type=str, default=None,
                         help="Compresses exported file "
-                             "('bz2', 'gzip', 'tar', 'xz', 'zip', 'zstd').")
+                             "('bz2', 'gzip', 'tar', 'xz', 'zip', 'zstd'; "
+                             "parquet: 'snappy', 'gzip', 'brotli', 'lz4', 'zstd'; feather: 'lz4', 'zstd').")
+    parser.add_argument("--format", type=str, default="csv", choices=["csv", "parquet", "feather"],
+                        help="Format of the exported HFData. Columnar formats (requires pyarrow) are exported to a "
+                             "dataset partitioned by machine, tool number and G-code hash.")
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Directory of a cache of parsed recordings (recordings are only parsed once)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of processes that transform recordings in parallel (sequential if not set)")
 
     opt = parse_arguments(parser)
 
+    if (opt.format != "csv") and (not opt.only_info):
+        try:
+            import pyarrow
+        except ImportError:
+            raise Exception(f"Exporting to {opt.format} requires pyarrow (pip install pyarrow).")
+
     folder_export = Path(opt.destination)
     folder_source = Path(opt.source)
 
@@ -70,90 +320,76 @@ if __name__ == "__main__":
     ]
     # this is a pattern. May continue with an index such as: [u1,1]
 
+    # transformed recordings of previous (or interrupted) runs
+    manifest = Manifest(folder_export / "manifest.jsonl")
+    options = {"only_info": opt.only_info, "compression": opt.compression, "format": opt.format}
+
     # find files to parse
     files = []
+    inputs = dict()
+    folders = []
     suffix_export_file = f".{opt.compression}" if opt.compression is not None else ".csv"
     # walk through folders
     for i, el in enumerate(folder_source.iterdir()):
+        if el.is_dir():
+            folders.append(el.name)
         # skip first folders
         if i < opt.start_index:
             continue
 
         if el.is_dir():
+            # skip unchanged recordings
+            inputs[el.name] = manifest.inputs(el)
+            if manifest.is_done(el, options, inputs[el.name], folder_export):
+                continue
             # construct export file name
-            filename_export = folder_export / el.with_suffix(suffix_export_file).name
+            if opt.format == "csv":
+                filename_export = folder_export / el.with_suffix(suffix_export_file).name
+            else:
+                # the partition is only known after parsing (file of a previous run)
+                export = manifest.records.get(el.name, dict()).get("export")
+                filename_export = (folder_export / export["file"]) if export else None
             # skip if file exists and should not be overwritten
-            if (not filename_export.exists()) or (not opt.no_overwrite):
-                files.append(list(el.glob("**/*.json")))
+            if (filename_export is None) or (not filename_export.exists()) or (not opt.no_overwrite):
+                # plan files by their footers only (longest recording first)
+                chains = find_chains(el)
+                if chains:
+                    files.append(chains[0].files)
+    logging.info(f"{len(files)} new or changed recordings, {len(manifest.records)} in {manifest.file.name}.")
 
-    info = []
+    kwargs = {
+        "folder_export": folder_export,
+        "keys_toolinfo": keys_toolinfo,
+        "only_info": opt.only_info,
+        "compression": opt.compression,
+        "cache": opt.cache,
+        "file_format": opt.format
+    }
     k = 0
-    for i, fl in enumerate(tqdm(files)):
-        logging.debug(f"Current folder: {fl}")
-        foldername = fl[0].parent.name
-        # parse file
-        try:
-            data = parse(fl, rename_hfdata=True)
-        except Exception as ex:
-            raise Exception(f"Failed to parse {foldername} with exception") from ex
-
-        try:
-            # create unique hash from G code
-            id = data.hash_g_code()
-        except Exception as ex:
-            warnings.warn(
-                f"Failed to hash G-code of {foldername} with exception: {ex}"
-                "\nSkipping this file."
-            )
-            continue
-
-        try:
-            # extract tool information and limit signals to this exact tool
-            tool_info, lim = get_tool_info(data, keys_toolinfo)
-        except Exception as ex:
-            raise Exception(f"Failed to get tool info {foldername} with the exception: {ex}")
-
-        n_rows, n_cols = data.get_item("HFData", limit_to=lim).shape
-        info.append({
-            "filename": foldername,
-            "n_rows": n_rows, "n_cols": n_cols,
-            "date": data["HFData", "Time"][0],
-            **tool_info,
-            "G code hash": id,
-        })
-
-        # export HFData
-        if not opt.only_info:
-            columns_to_exclude = ["CYCLE", "HFProbeCounter"]
-            columns = [el for el in data["HFData"].columns if el not in columns_to_exclude]
-
-            # construct export file name
-            filename_export = (folder_export / foldername).with_suffix(suffix_export_file)
-            # export to CSV
-            data.get_item("HFData", columns, not_na=True, limit_to=lim).to_csv(
-                filename_export,
-                header=True,
-                index=False,
-                compression=opt.compression
-            )
-
-        k += 1
-
-    # create DataFrame
-    df = pd.DataFrame(info)
-
-    # sort by recording date
-    if len(df) > 1:
-        df.sort_values(by="date", inplace=True, ignore_index=True)
+    if (opt.workers is not None) and (opt.workers > 1):
+        # each worker transforms whole folders; results are recorded as they finish
+        with ProcessPoolExecutor(max_workers=opt.workers) as pool:
+            futures = {pool.submit(transform_recording, fl, **kwargs): fl[0].parent.name for fl in files}
+            try:
+                for future in tqdm(as_completed(futures), total=len(futures)):
+                    info, export = future.result()
+                    foldername = futures[future]
+                    manifest.add(foldername, options, inputs[foldername], info, export)
+                    k += int(info is not None)
+            except BaseException:
+                # do not start the remaining folders (the finished ones are recorded)
+                pool.shutdown(cancel_futures=True)
+                raise
+    else:
+        for fl in tqdm(files):
+            info, export = transform_recording(fl, **kwargs)
+            foldername = fl[0].parent.name
+            manifest.add(foldername, options, inputs[foldername], info, export)
+            k += int(info is not None)
 
+    # create DataFrame of all recordings of the source (sorted by recording date)
+    df = manifest.to_frame(folders)
     info_file = folder_export / "info.csv"
-    i = 0
-    while True:
-        if info_file.exists():
-            info_file = info_file.with_stem(f"info_{i}")
-        else:
-            break
-        i += 1
     df.to_csv(info_file, header=True, index=False)
 
-    logging.info(f"Exported {k} files + {info_file.name} to {opt.destination}.")
+    logging.info(f"Transformed {k} recordings + {info_file.name} to {opt.destination}.")
@@ -3,11 +3,17 @@ import pandas as pd
 import numpy as np
 import json
 from tqdm import tqdm
-from itertools import chain
+from itertools import chain, islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from typing import Union, Dict, Tuple, List, Any, Generator
 
 
+# file extensions of the columnar export (partitioned dataset, see transform_recordings.py)
+columnar_extensions = (".parquet", ".feather")
+
+
 def save_dict_of_dataframes(filename: Union[str, Path], dictionary: Dict[str, pd.DataFrame]) -> bool:
     """Converts a dictionary of pandas.DataFrames to a dictionary of dictionaries and saves them in a JSON file."""
     # convert all dataframes to dictionaries and dump into a JSON file
@@ -35,8 +41,13 @@ def get_list_of_files(
     data_directory = Path(data_directory)
     # create extension pattern
     pattern = "*." + file_extension.strip(".") if file_extension else "*"
+    # files of a columnar export are located in the partitions of the dataset
+    columnar = file_extension and (f".{file_extension.strip('.').lower()}" in columnar_extensions)
+    partitioned = {p.stem: p for p in data_directory.rglob(pattern)} if columnar and path_to_metadata else dict()
 
     def reconstruct_path(x: str):
+        if x in partitioned:
+            return partitioned[x].resolve()
         p = data_directory / x
         return p.with_suffix(file_extension).resolve() if file_extension else p
 
@@ -57,31 +68,102 @@ def get_list_of_files(
             files_per_key = {ky: fls.apply(reconstruct_path).tolist() for ky, fls in files_per_key if len(fls) >= n_min}
     else:
 
-        files_per_key = {None: list(Path(data_directory).glob(pattern))}
+        files_per_key = {None: list(data_directory.rglob(pattern) if columnar else data_directory.glob(pattern))}
 
     for ky, files in files_per_key.items():
         yield files, ky
 
 
+def read_columnar_schema(file: Path) -> List[str]:
+    """column names of a columnar file (.parquet, .feather) without reading its data (requires pyarrow)"""
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    if file.suffix.lower() == ".parquet":
+        return pyarrow.parquet.read_schema(file).names
+    # feather (version 2) is the arrow IPC file format
+    with pyarrow.ipc.open_file(file) as reader:
+        return reader.schema.names
+
+
+def read_file(file: Path, columns: List[str] = None) -> pd.DataFrame:
+    """
+    reads an exported recording
+    :param file: CSV file or columnar file (.parquet, .feather)
+    :param columns: only read these columns (all if None, columns that do not exist in the file are ignored). Columns
+    of a CSV file other than "Time" are read as floats.
+    :return: DataFrame
+    """
+    suffix = file.suffix.lower()
+    if (suffix in columnar_extensions) and (columns is not None):
+        existing = set(read_columnar_schema(file))
+        columns = [el for el in columns if el in existing]
+    if suffix == ".parquet":
+        # timestamps and data types are stored natively
+        return pd.read_parquet(file, columns=columns)
+    elif suffix == ".feather":
+        return pd.read_feather(file, columns=columns)
+
+    if columns is None:
+        df = pd.read_csv(file)
+    else:
+        # skip parsing the other columns and inferring the data types of the signals
+        df = pd.read_csv(
+            file,
+            usecols=lambda x: x in columns,
+            dtype={el: np.float64 for el in columns if el != "Time"}
+        )
+    # convert timestamp
+    if "Time" in df:
+        df["Time"] = pd.to_datetime(df["Time"], format="ISO8601")
+    return df
+
+
 def get_files(
         files: Union[List[Union[str, Path]], Generator],
         start_index: int = 0,
+        columns: List[str] = None,
+        prefetch: int = 2
 ) -> Tuple[Path, pd.DataFrame, Any]:
+    """
+    reads exported recordings one after another. The next files are read in background threads while the caller
+    processes the current one.
+    :param files: files or generator of get_list_of_files()
+    :param start_index: skip the first files
+    :param columns: only read these columns (all if None), see read_file()
+    :param prefetch: number of files that are read ahead (0: read each file when it is requested)
+    :return: generator of file and DataFrame (named by the file)
+    """
 
     if isinstance(files, Generator):
         # flatten list of files and ignore filter keys
         files = list(chain.from_iterable([p for p, ky in files]))
-
-    # loop over files
-    for i in tqdm(range(start_index, len(files))):
-        file = files[i]
-        # read file
-        df = pd.read_csv(file)
-        # convert timestamp
-        if "Time" in df:
-            df["Time"] = pd.to_datetime(df["Time"], format="ISO8601")
-        df.name = file.as_posix()
-        yield file, df
+    files = files[start_index:]
+
+    if prefetch < 1:
+        # loop over files
+        for file in tqdm(files):
+            # read file
+            df = read_file(file, columns)
+            df.name = file.as_posix()
+            yield file, df
+        return
+
+    pool = ThreadPoolExecutor(max_workers=prefetch)
+    try:
+        remaining = iter(files)
+        # files that are being read in the order of the list
+        pending = deque((fl, pool.submit(read_file, fl, columns)) for fl in islice(remaining, prefetch))
+        for _ in tqdm(range(len(files))):
+            file, future = pending.popleft()
+            for fl in islice(remaining, 1):
+                pending.append((fl, pool.submit(read_file, fl, columns)))
+            df = future.result()
+            df.name = file.as_posix()
+            yield file, df
+    finally:
+        # the caller may stop early
+        pool.shutdown(wait=True, cancel_futures=True)
 
 
 def read_info_files(path: Union[str, Path, Generator, List[Union[str, Path]]] = "info*.csv") -> pd.DataFrame:
@@ -11,7 +11,8 @@ def get_signal(
         window_size: Union[int, float] = 0,
         method: str = "rmse",
         in_seconds: bool = False,
-        limit: Union[int, float] = 0
+        limit: Union[int, float] = 0,
+        step: Union[int, float] = None
 ) -> Union[pd.Series, None]:
     try:
         sig = df[key]
@@ -25,6 +26,18 @@ def get_signal(
         warnings.warn(f"No time found in {df.name}.")
         return None
 
+    # limit signal length (before aggregating it, i.e. samples past the limit are not processed)
+    if limit > 0:
+        try:
+            fct = (1 / get_time_period(time, True)) if in_seconds else 1
+            end = int(round(limit * fct))
+            # slice signal
+            sig = sig.iloc[:end]
+            if time is not None:
+                time = time.iloc[:end]
+        except Exception as ex:
+            raise Exception(f"Failed to limit {key} in {df.name} with exception: {ex}")
+
     if window_size > 0:
         sig = aggregate_signal(
             sig,
@@ -32,18 +45,9 @@ def get_signal(
             window_size,
             in_seconds,
             time=time,
+            step=step
         )
 
-    # limit signal length
-    if limit > 0:
-        try:
-            fct = (1 / get_time_period(time, True)) if in_seconds else 1
-            end = int(round(limit * fct))
-            # slice signal
-            sig = sig[:end]
-        except Exception as ex:
-            raise Exception(f"Failed to limit {key} in {df.name} with exception: {ex}")
-
     return sig
 
 
@@ -52,13 +56,91 @@ def get_time_period(time: pd.Series, in_seconds: bool = False) -> Union[int, flo
     return (dt_ns / 10 ** 9) if in_seconds else dt_ns
 
 
+def aggregate_windows(
+        values: np.ndarray,
+        method: str,
+        window: int,
+        step: int = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    reduces the rows of a signal matrix over windows of a fixed number of rows. The window at position p covers the
+    rows [p - window // 2, p - window // 2 + window) (centered as by pandas' rolling(center=True)); the positions are
+    the multiples of step, beginning with the first step. A window with a NaN or beyond the first or last row is NaN.
+    Non-overlapping windows (step == window) are reduced on a reshaped view, overlapping windows by cumulative sums
+    (sum, mean, rms) or running windows (min, max, median).
+    :param values: signals (rows x columns)
+    :param method: "rms", "sum", "mean", "median", "min", "max"
+    :param window: number of rows per window
+    :param step: number of rows between the positions of the windows (window if None)
+    :return: positions (rows) and the reduced values (positions x columns)
+    """
+    step = window if step is None else step
+    if (window < 1) or (step < 1):
+        raise ValueError(f"Window ({window}) and step ({step}) must be positive.")
+    n, n_cols = values.shape
+    positions = np.arange(step, n, step)
+    starts = positions - window // 2
+    result = np.full((len(positions), n_cols), np.nan)
+    # complete windows only (a contiguous range of the windows)
+    i0 = int(np.count_nonzero(starts < 0))
+    i1 = int(np.count_nonzero(starts + window <= n))
+    if i1 <= i0:
+        return positions, result
+    starts = starts[i0:i1]
+
+    fncs = {"sum": np.sum, "mean": np.mean, "median": np.median, "min": np.min, "max": np.max}
+    if method not in ("rms", *fncs):
+        raise ValueError(f"Unknown method: {method}")
+
+    if step == window:
+        # consecutive windows: reduce along the rows of a reshaped view
+        blocks = values[starts[0]:starts[-1] + window].reshape((len(starts), window, n_cols))
+        if method == "rms":
+            result[i0:i1] = np.sqrt(np.mean(np.square(blocks), axis=1))
+        else:
+            result[i0:i1] = fncs[method](blocks, axis=1)
+    elif method in ("rms", "sum", "mean"):
+        # windows by differences of cumulative sums (NaN would propagate to all later windows: count them instead)
+        x = np.square(values) if method == "rms" else values.astype(np.float64, copy=False)
+        is_nan = np.isnan(x)
+        cum = np.zeros((n + 1, n_cols))
+        np.cumsum(np.where(is_nan, 0, x), axis=0, out=cum[1:])
+        cum_nan = np.zeros((n + 1, n_cols), dtype=np.int64)
+        np.cumsum(is_nan, axis=0, out=cum_nan[1:])
+
+        agg = cum[starts + window] - cum[starts]
+        if method != "sum":
+            agg /= window
+        if method == "rms":
+            agg = np.sqrt(np.maximum(agg, 0))
+        agg[(cum_nan[starts + window] - cum_nan[starts]) > 0] = np.nan
+        result[i0:i1] = agg
+    else:
+        # running min / max / median over all rows (memory bounded by the size of the signals), taken at the last row
+        # of each window
+        rolling = pd.DataFrame(values, copy=False).rolling(window)
+        result[i0:i1] = getattr(rolling, method)().to_numpy()[starts + window - 1]
+    return positions, result
+
+
 def aggregate_signal(
-        signals: pd.DataFrame,
+        signals: Union[pd.DataFrame, pd.Series],
         method: str,
         window_size: Union[int, float],
         in_seconds: bool = False,
         time: pd.Series = None,
-) -> Union[pd.DataFrame, None]:
+        step: Union[int, float] = None
+) -> Union[pd.DataFrame, pd.Series, None]:
+    """
+    aggregates signals over centered windows (see aggregate_windows()), all columns at once
+    :param signals: signal(s)
+    :param method: "rms", "sum", "mean", "median", "min", "max" or their absolute variants, e.g. "absMean"
+    :param window_size: number of rows or duration (in_seconds) of a window
+    :param in_seconds: window_size and step are durations in seconds
+    :param time: time of the signals (only needed if in_seconds)
+    :param step: number of rows or duration between the windows (non-overlapping windows if None)
+    :return: aggregated signal(s) at the positions of the windows (without the first window that is always NaN)
+    """
     method = method.lower()
 
     # aggregate signal
@@ -71,34 +153,21 @@ def aggregate_signal(
 
         # rows per second
         wz = int(round(window_size * 10 ** 9 / int(dt)))
+        step = int(round(step * 10 ** 9 / int(dt))) if step is not None else None
     else:
         wz = int(window_size)
-
-    # arguments for rolling window function
-    kwargs = {
-        "window": wz,
-        "step": wz,
-        "center": True
-    }
+        step = int(step) if step is not None else None
 
     # methods
+    values = signals.to_numpy(dtype=np.float64, na_value=np.nan)
     if (len(method) > 3) and (method[:3] == "abs"):
-        signals = signals.abs()
+        values = np.abs(values)
         method = method[3:]
-
-    if method in ("rms", "rmse"):
-        df_aggregated = signals.pow(2).rolling(**kwargs).apply(lambda x: np.sqrt(x.mean()))
-    elif method == "sum":
-        df_aggregated = signals.rolling(**kwargs).mean()
-    elif method == "mean":
-        df_aggregated = signals.rolling(**kwargs).mean()
-    elif method == "median":
-        df_aggregated = signals.rolling(**kwargs).median()
-    elif method == "max":
-        df_aggregated = signals.rolling(**kwargs).max()
-    elif method == "min":
-        df_aggregated = signals.rolling(**kwargs).min()
-    else:
-        raise ValueError(f"Unknown method: {method}")
-
-    return df_aggregated.drop(0)  # drop first row because it is always NaN
+    if method == "rmse":
+        method = "rms"
+
+    positions, aggregated = aggregate_windows(values if values.ndim == 2 else values[:, np.newaxis], method, wz, step)
+    index = signals.index[positions]
+    if isinstance(signals, pd.Series):
+        return pd.Series(aggregated[:, 0], index=index, name=signals.name)
+    return pd.DataFrame(aggregated, index=index, columns=signals.columns)